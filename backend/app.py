@@ -1,26 +1,89 @@
-from flask import Flask, request, jsonify, Response
+from flask import Flask, request, jsonify, Response, g, send_file, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import sqlite3
 import os
 import sys
+import re
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta
 import smtplib
+import string
 import html
 import markdown
-from io import BytesIO
-from xhtml2pdf import pisa
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
+try:
+    import orjson
+except ImportError:
+    orjson = None
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from config import DATABASE_PATH
-from db import get_db_connection as _get_db_connection
+from config import DATABASE_PATH, wait_for_migrations
+from db import ConnectionPool
 from services.scheduler_service import SchedulerService
 from services.prompt_service import PromptService
 from services.group_research_service import GroupResearchService
 from services.document_research_service import DocumentResearchService
+from services.pdf_renderer import render_pdf
 
 app = Flask(__name__)
 CORS(app)
 
+class AppJSONProvider(DefaultJSONProvider):
+    """Default provider that also accepts sqlite3.Row objects (encoded as dicts)."""
+    # No key sorting or debug pretty-printing: smaller bodies, less work per response
+    sort_keys = False
+    compact = True
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, sqlite3.Row):
+            return dict(o)
+        return DefaultJSONProvider.default(o)
+
+if orjson is not None:
+    class OrjsonProvider(AppJSONProvider):
+        """Flask JSON provider backed by orjson (falls back to Flask's default for odd types)."""
+        OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj, default=self.default, option=self.OPTIONS).decode('utf-8')
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    app.json = OrjsonProvider(app)
+else:
+    app.json = AppJSONProvider(app)
+
+_pdf_render_pool = None
+_pdf_render_pool_lock = threading.Lock()
+
+def get_pdf_render_pool():
+    """
+    Analysis PDF layout is CPU-bound, so renders run in worker processes rather than
+    competing for the GIL with request threads. The pool is created on first use and
+    its workers are spawned, not forked: the app already has threads by then, and a
+    forked child can deadlock on a lock one of them held.
+    Spawned workers import only services.pdf_renderer, except when app.py is itself
+    the __main__ script (they would re-run it), so that and frozen builds use threads.
+    """
+    global _pdf_render_pool
+    with _pdf_render_pool_lock:
+        if _pdf_render_pool is None:
+            if getattr(sys, 'frozen', False) or __name__ == '__main__':
+                _pdf_render_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='pdf-render')
+            else:
+                _pdf_render_pool = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('spawn'))
+        return _pdf_render_pool
+
 # Initialize and start the background scheduler
+# gunicorn runs a single worker process (see gunicorn.conf.py), so this scheduler's
+# poll lock and status are the only ones the poll endpoints ever see
 scheduler = SchedulerService(poll_interval_seconds=300)  # Poll every 5 minutes
 if getattr(sys, "frozen", False):
     # Packaged app: always start the scheduler
@@ -34,8 +97,118 @@ document_research_service = DocumentResearchService()
 
 DB_PATH = str(DATABASE_PATH)
 
+# Hot-path SQL kept as module constants so every request hands the connection's
+# statement cache the exact same string
+SQL_STOCK_LOOKUP = "SELECT id FROM stocks WHERE stock_symbol = ? OR bse_code = ?"
+
+SQL_SEARCH_STOCKS = """
+    SELECT id, symbol, name FROM (
+        SELECT id, COALESCE(stock_symbol, bse_code) as symbol, stock_name as name,
+            CASE
+                WHEN stock_symbol = ? THEN 1
+                WHEN bse_code = ? THEN 2
+                WHEN stock_symbol GLOB ? THEN 3
+                ELSE 4
+            END as rank
+        FROM stocks
+        WHERE stock_symbol GLOB ? OR bse_code GLOB ?
+        UNION ALL
+        SELECT s.id, COALESCE(s.stock_symbol, s.bse_code), s.stock_name, 5
+        FROM stocks_fts f
+        JOIN stocks s ON s.id = f.rowid
+        WHERE ? != '' AND stocks_fts MATCH ?
+    )
+    GROUP BY id
+    ORDER BY MIN(rank), symbol ASC
+    LIMIT 10
+"""
+
+# Watchlist rows joined with the selected quarter's transcript (UNIQUE per
+# stock/quarter/year) and that transcript's latest analysis
+SQL_WATCHLIST = """
+    SELECT 
+        s.id,
+        COALESCE(s.stock_symbol, s.bse_code) as symbol, 
+        s.stock_name as name,
+        w.added_at,
+        tc.status as transcript_check_status,
+        t.id as transcript_id,
+        t.quarter,
+        t.year,
+        t.status as transcript_status,
+        t.event_date,
+        t.created_at as transcript_created_at,
+        t.analysis_status,
+        t.analysis_error,
+        a.id as analysis_id,
+        a.created_at as analysis_created_at,
+        a.model_provider as analysis_provider
+    FROM watchlist_items w
+    JOIN stocks s ON s.id = w.stock_id
+    LEFT JOIN transcript_checks tc ON tc.stock_id = s.id
+    LEFT JOIN transcripts t ON t.stock_id = s.id AND t.quarter = ? AND t.year = ?
+    LEFT JOIN transcript_analyses a ON a.id = (
+        SELECT id FROM transcript_analyses
+        WHERE transcript_id = t.id
+        ORDER BY created_at DESC
+        LIMIT 1
+    )
+    ORDER BY w.added_at DESC
+"""
+
+# Stocks in a group with transcript status for the selected quarter
+SQL_GROUP_STOCKS = """
+    SELECT 
+        s.id,
+        COALESCE(s.stock_symbol, s.bse_code) as symbol, 
+        s.stock_name as name, 
+        gs.added_at,
+        t.quarter,
+        t.year,
+        t.status as transcript_status,
+        t.created_at as transcript_created_at
+    FROM stocks s
+    JOIN group_stocks gs ON s.id = gs.stock_id
+    LEFT JOIN transcripts t ON t.stock_id = s.id 
+        AND t.quarter = ? AND t.year = ?
+    WHERE gs.group_id = ?
+    ORDER BY gs.added_at DESC
+"""
+
+# Warm connections shared by all request threads; each request checks one out
+# on first use and hands it back (rolled back if uncommitted) at teardown. Opened
+# on demand rather than at import, where they'd race the startup migrations (which
+# also switch the file to WAL). Sized to gunicorn's thread count (gunicorn.conf.py)
+# so no request thread waits on the pool.
+REQUEST_POOL_SIZE = max(int(os.environ.get('GUNICORN_THREADS', 32)), 10)
+_pool = ConnectionPool(DB_PATH, min_size=0, max_size=REQUEST_POOL_SIZE, cached_statements=512)
+
 def get_db_connection():
-    return _get_db_connection(DB_PATH)
+    if 'db_conn' not in g:
+        g.db_conn = _pool.get()
+    return g.db_conn
+
+def _row_dicts(cursor):
+    """Iterate the cursor's remaining rows as plain dicts.
+
+    Column names are read once per query and zipped onto raw tuples, which is
+    cheaper than building each dict from a sqlite3.Row.
+    """
+    cursor.row_factory = None
+    columns = [col[0] for col in cursor.description]
+    return (dict(zip(columns, row)) for row in cursor)
+
+@app.before_request
+def wait_for_db_migrations():
+    # Startup migrations run on a background thread (see config); a no-op once done
+    if not wait_for_migrations():
+        return jsonify({'error': 'Database migration still in progress; try again shortly'}), 503
+
+@app.teardown_appcontext
+def release_db_connection(exc):
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        _pool.put(conn)
 
 @app.route('/api/poll/status', methods=['GET'])
 def get_poll_status():
@@ -54,24 +227,18 @@ def trigger_poll():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Indexed by calendar month - 1
+_FY_QUARTER_BY_MONTH = ("Q4", "Q4", "Q4", "Q1", "Q1", "Q1", "Q2", "Q2", "Q2", "Q3", "Q3", "Q3")
+_FY_YEAR_BUMP_BY_MONTH = (0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1)
+
 def get_current_fy_quarter():
     """
     Returns (quarter, fiscal_year) based on current date.
     Indian FY: Q1=Apr-Jun, Q2=Jul-Sep, Q3=Oct-Dec, Q4=Jan-Mar
     """
-    from datetime import datetime
     now = datetime.now()
-    month = now.month
-    year = now.year
-    
-    if 4 <= month <= 6:
-        return "Q1", year + 1
-    elif 7 <= month <= 9:
-        return "Q2", year + 1
-    elif 10 <= month <= 12:
-        return "Q3", year + 1
-    else:  # 1-3 (Jan, Feb, Mar)
-        return "Q4", year
+    index = now.month - 1
+    return _FY_QUARTER_BY_MONTH[index], now.year + _FY_YEAR_BUMP_BY_MONTH[index]
 
 def get_previous_fy_quarter():
     """
@@ -113,43 +280,74 @@ def get_available_quarters(count=8):
     
     return quarters
 
+def _cacheable(response, cache_control):
+    """Attach Cache-Control + ETag and answer If-None-Match with a 304."""
+    response.headers['Cache-Control'] = cache_control
+    response.add_etag()
+    return response.make_conditional(request)
+
+# (date, serialized body) - the quarter list only changes when the date does
+_quarters_cache = (None, None)
+
 @app.route('/api/quarters', methods=['GET'])
 def get_quarters():
     """Returns list of quarters for dropdown."""
-    quarters = get_available_quarters()
-    return jsonify(quarters)
+    global _quarters_cache
+    today = date.today()
+    cached_day, body = _quarters_cache
+    if cached_day != today:
+        body = app.json.dumps(get_available_quarters())
+        _quarters_cache = (today, body)
+    # Valid until midnight, when the quarter list can next change
+    midnight = datetime.combine(today + timedelta(days=1), datetime.min.time())
+    max_age = int((midnight - datetime.now()).total_seconds())
+    return _cacheable(Response(body, mimetype='application/json'), f'public, max-age={max_age}')
+
+MIN_SEARCH_LENGTH = 2
+SHORT_SEARCH_LENGTH = 2
 
 @app.route('/api/stocks', methods=['GET'])
 def search_stocks():
-    query = request.args.get('q', '')
-    if not query:
+    query = request.args.get('q', '').strip()
+    if len(query) < MIN_SEARCH_LENGTH:
         return jsonify([])
+    # Very short queries only match symbol/code prefixes; a 2-letter name search
+    # matches most of the table and isn't useful
+    prefix_only = len(query) <= SHORT_SEARCH_LENGTH
 
     conn = get_db_connection()
     cursor = conn.cursor()
     
     # Search by NSE symbol, BSE code, or name, limit to 10 results
     # Use COALESCE to return NSE symbol if available, otherwise BSE code
-    search_term = f"%{query}%"
-    cursor.execute("""
-        SELECT id, COALESCE(stock_symbol, bse_code) as symbol, stock_name as name 
-        FROM stocks 
-        WHERE stock_symbol LIKE ? OR bse_code LIKE ? OR stock_name LIKE ? 
-        ORDER BY 
-            CASE 
-                WHEN stock_symbol = ? THEN 1 
-                WHEN bse_code = ? THEN 2
-                WHEN stock_symbol LIKE ? THEN 3 
-                WHEN bse_code LIKE ? THEN 4
-                WHEN stock_name LIKE ? THEN 5 
-                ELSE 6 
-            END,
-            COALESCE(stock_symbol, bse_code) ASC
-        LIMIT 10
-    """, (search_term, search_term, search_term, query, query, f"{query}%", f"{query}%", f"{query}%"))
+    # Symbols/codes are matched by prefix via GLOB (case-sensitive, so it can use
+    # idx_stock_symbol/idx_bse_code); names go through the stocks_fts index.
+    code = re.sub(r'[*?\[\]]', '', query.strip().upper())
+    tokens = [] if prefix_only else re.findall(r'\w+', query)
+    name_match = ' '.join(f'"{token}"*' for token in tokens)
+    try:
+        cursor.execute(SQL_SEARCH_STOCKS, (code, code, f"{code}*", f"{code}*", f"{code}*", name_match, name_match or '""'))
+    except sqlite3.OperationalError:
+        # No FTS5 in this SQLite build: fall back to plain LIKE scans
+        search_term = f"{query}%" if prefix_only else f"%{query}%"
+        cursor.execute("""
+            SELECT id, COALESCE(stock_symbol, bse_code) as symbol, stock_name as name 
+            FROM stocks 
+            WHERE stock_symbol LIKE ? OR bse_code LIKE ? OR stock_name LIKE ? 
+            ORDER BY 
+                CASE 
+                    WHEN stock_symbol = ? THEN 1 
+                    WHEN bse_code = ? THEN 2
+                    WHEN stock_symbol LIKE ? THEN 3 
+                    WHEN bse_code LIKE ? THEN 4
+                    WHEN stock_name LIKE ? THEN 5 
+                    ELSE 6 
+                END,
+                COALESCE(stock_symbol, bse_code) ASC
+            LIMIT 10
+        """, (search_term, search_term, search_term, query, query, f"{query}%", f"{query}%", f"{query}%"))
     
-    stocks = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    stocks = list(_row_dicts(cursor))
     
     # Add default status for now (since it's not in DB yet)
     for stock in stocks:
@@ -157,6 +355,17 @@ def search_stocks():
         
     return jsonify(stocks)
 
+def _stream_json_array(items):
+    """Serialize an iterable as a JSON array chunk by chunk."""
+    def generate():
+        yield '['
+        for index, item in enumerate(items):
+            if index:
+                yield ','
+            yield app.json.dumps(item)
+        yield ']'
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
 @app.route('/api/watchlist', methods=['GET'])
 def get_watchlist():
     conn = get_db_connection()
@@ -169,162 +378,114 @@ def get_watchlist():
     if not quarter or not year:
         quarter, year = get_previous_fy_quarter()
     
-    cursor.execute("""
-        SELECT 
-            s.id,
-            COALESCE(s.stock_symbol, s.bse_code) as symbol, 
-            s.stock_name as name,
-            w.added_at,
-            tc.status as transcript_check_status
-        FROM stocks s 
-        JOIN watchlist_items w ON s.id = w.stock_id 
-        LEFT JOIN transcript_checks tc ON tc.stock_id = s.id
-        ORDER BY w.added_at DESC
-    """)
+    cursor.execute(SQL_WATCHLIST, (quarter, year))
     
-    stocks = []
-    for row in cursor.fetchall():
-        stock_id = row['id']
-        
-        # Get transcript info for SELECTED QUARTER only
-        cursor.execute("""
-            SELECT 
-                id,
-                quarter, 
-                year, 
-                status, 
-                event_date,
-                source_url,
-                created_at,
-                analysis_status,
-                analysis_error
-            FROM transcripts 
-            WHERE stock_id = ? AND quarter = ? AND year = ?
-            ORDER BY 
-                CASE status 
-                    WHEN 'available' THEN 0
-                    WHEN 'upcoming' THEN 1
-                    ELSE 2
-                END,
-                COALESCE(updated_at, created_at) DESC,
-                id DESC
-            LIMIT 1
-        """, (stock_id, quarter, year))
-        
-        transcript = cursor.fetchone()
-        
-        # Get latest analysis info
-        analysis_info = None
-        if transcript:
-            cursor.execute("""
-                SELECT 
-                    id,
-                    created_at,
-                    model_provider
-                FROM transcript_analyses 
-                WHERE transcript_id = ? 
-                ORDER BY created_at DESC 
-                LIMIT 1
-            """, (transcript['id'],))
-            
-            analysis = cursor.fetchone()
-            if analysis:
-                analysis_info = {
-                    'completed': True,
-                    'date': analysis['created_at'],
-                    'provider': analysis['model_provider']
-                }
-        
-        # Determine detailed status
-        status_info = {
-            'status': 'no_transcript',
-            'message': 'No transcript available',
-            'details': None
+    # Stream entries straight off the cursor instead of building the full list
+    return _stream_json_array(_watchlist_entry(row) for row in cursor)
+
+def _watchlist_entry(row):
+    """Shape one joined watchlist row into the API payload with its status."""
+    stock_id = row['id']
+    transcript = row if row['transcript_id'] is not None else None
+
+    # Latest analysis info
+    analysis_info = None
+    if row['analysis_id'] is not None:
+        analysis_info = {
+            'completed': True,
+            'date': row['analysis_created_at'],
+            'provider': row['analysis_provider']
         }
-        
-        if transcript:
-            analysis_state = transcript['analysis_status']
-            analysis_error = transcript['analysis_error']
 
-            if analysis_state == 'in_progress':
+    # Determine detailed status
+    status_info = {
+        'status': 'no_transcript',
+        'message': 'No transcript available',
+        'details': None
+    }
+
+    if transcript:
+        analysis_state = transcript['analysis_status']
+        analysis_error = transcript['analysis_error']
+
+        if analysis_state == 'in_progress':
+            status_info = {
+                'status': 'analyzing',
+                'message': 'Analyzing transcript...',
+                'details': {
+                    'quarter': transcript['quarter'],
+                    'year': transcript['year']
+                }
+            }
+        elif row['transcript_check_status'] == 'checking':
+            status_info = {
+                'status': 'fetching',
+                'message': 'Fetching transcript...',
+                'details': {
+                    'quarter': transcript['quarter'],
+                    'year': transcript['year']
+                }
+            }
+        elif transcript['transcript_status'] == 'upcoming':
+            status_info = {
+                'status': 'upcoming',
+                'message': f"Upcoming: {transcript['event_date']}",
+                'details': {
+                    'quarter': transcript['quarter'],
+                    'year': transcript['year'],
+                    'event_date': transcript['event_date']
+                }
+            }
+        elif transcript['transcript_status'] == 'available':
+            if analysis_state == 'error' and not analysis_info:
                 status_info = {
-                    'status': 'analyzing',
-                    'message': 'Analyzing transcript...',
+                    'status': 'analysis_failed',
+                    'message': 'Analysis failed',
                     'details': {
                         'quarter': transcript['quarter'],
-                        'year': transcript['year']
+                        'year': transcript['year'],
+                        'analysis_error': analysis_error
                     }
                 }
-            elif row['transcript_check_status'] == 'checking':
+            elif analysis_info:
                 status_info = {
-                    'status': 'fetching',
-                    'message': 'Fetching transcript...',
+                    'status': 'analyzed',
+                    'message': f"Analysis Complete ({transcript['quarter']} {transcript['year']})",
                     'details': {
                         'quarter': transcript['quarter'],
-                        'year': transcript['year']
+                        'year': transcript['year'],
+                        'analyzed_at': analysis_info['date'],
+                        'provider': analysis_info['provider']
                     }
                 }
-            elif transcript['status'] == 'upcoming':
+            else:
                 status_info = {
-                    'status': 'upcoming',
-                    'message': f"Upcoming: {transcript['event_date']}",
+                    'status': 'transcript_ready',
+                    'message': f"Transcript Available ({transcript['quarter']} {transcript['year']})",
                     'details': {
                         'quarter': transcript['quarter'],
                         'year': transcript['year'],
-                        'event_date': transcript['event_date']
+                        'transcript_date': transcript['transcript_created_at']
                     }
                 }
-            elif transcript['status'] == 'available':
-                if analysis_state == 'error' and not analysis_info:
-                    status_info = {
-                        'status': 'analysis_failed',
-                        'message': 'Analysis failed',
-                        'details': {
-                            'quarter': transcript['quarter'],
-                            'year': transcript['year'],
-                            'analysis_error': analysis_error
-                        }
-                    }
-                elif analysis_info:
-                    status_info = {
-                        'status': 'analyzed',
-                        'message': f"Analysis Complete ({transcript['quarter']} {transcript['year']})",
-                        'details': {
-                            'quarter': transcript['quarter'],
-                            'year': transcript['year'],
-                            'analyzed_at': analysis_info['date'],
-                            'provider': analysis_info['provider']
-                        }
-                    }
-                else:
-                    status_info = {
-                        'status': 'transcript_ready',
-                        'message': f"Transcript Available ({transcript['quarter']} {transcript['year']})",
-                        'details': {
-                            'quarter': transcript['quarter'],
-                            'year': transcript['year'],
-                            'transcript_date': transcript['created_at']
-                        }
-                    }
-        elif row['transcript_check_status'] == 'checking':
-            status_info = {
-                'status': 'fetching',
-                'message': 'Fetching transcript...',
-                'details': None
-            }
-        
-        stocks.append({
-            'id': stock_id,
-            'symbol': row['symbol'],
-            'name': row['name'],
-            'added_at': row['added_at'],
-            'status': status_info['status'],
-            'status_message': status_info['message'],
-            'status_details': status_info['details']
-        })
-    
-    conn.close()
-    return jsonify(stocks)
+    elif row['transcript_check_status'] == 'checking':
+        status_info = {
+            'status': 'fetching',
+            'message': 'Fetching transcript...',
+            'details': None
+        }
+
+    return {
+        'id': stock_id,
+        'symbol': row['symbol'],
+        'name': row['name'],
+        'added_at': row['added_at'],
+        'status': status_info['status'],
+        'status_message': status_info['message'],
+        'status_details': status_info['details']
+    }
+
+MAX_BULK_SYMBOLS = 1000
 
 @app.route('/api/watchlist', methods=['POST'])
 def add_to_watchlist():
@@ -339,26 +500,73 @@ def add_to_watchlist():
     
     try:
         # Get stock ID - check both NSE symbol and BSE code
-        cursor.execute("SELECT id FROM stocks WHERE stock_symbol = ? OR bse_code = ?", (symbol, symbol))
+        cursor.execute(SQL_STOCK_LOOKUP, (symbol, symbol))
         stock = cursor.fetchone()
         
         if not stock:
             return jsonify({'error': 'Stock not found'}), 404
             
-        # Add to watchlist
-        cursor.execute("INSERT INTO watchlist_items (stock_id) VALUES (?)", (stock['id'],))
-        conn.commit()
+        # Add to watchlist and mark the transcript check pending in one commit
+        with conn:
+            cursor.execute("INSERT INTO watchlist_items (stock_id) VALUES (?)", (stock['id'],))
+            scheduler.mark_check_pending(conn, stock['id'])
 
         # Kick off immediate transcript check instead of waiting for the next poll
-        scheduler.trigger_check_for_stock(stock['id'])
+        scheduler.trigger_check_for_stock(stock['id'], status_marked=True)
         return jsonify({'message': 'Added to watchlist'}), 201
         
     except sqlite3.IntegrityError:
         return jsonify({'message': 'Already in watchlist'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
+
+@app.route('/api/watchlist/bulk', methods=['POST'])
+def add_to_watchlist_bulk():
+    data = request.json or {}
+    raw_symbols = data.get('symbols') or []
+    if not isinstance(raw_symbols, list) or not all(isinstance(sym, str) for sym in raw_symbols):
+        return jsonify({'error': 'symbols must be a list of strings'}), 400
+    symbols = list(dict.fromkeys(sym.strip() for sym in raw_symbols if sym.strip()))
+    
+    if not symbols:
+        return jsonify({'error': 'symbols is required'}), 400
+    if len(symbols) > MAX_BULK_SYMBOLS:
+        return jsonify({'error': f'At most {MAX_BULK_SYMBOLS} symbols per request'}), 400
+        
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        # Resolve every symbol (NSE or BSE code) in one query
+        placeholders = ','.join('?' * len(symbols))
+        cursor.execute(f"""
+            SELECT s.id, s.stock_symbol, s.bse_code, w.stock_id AS watched
+            FROM stocks s
+            LEFT JOIN watchlist_items w ON w.stock_id = s.id
+            WHERE s.stock_symbol IN ({placeholders}) OR s.bse_code IN ({placeholders})
+        """, symbols + symbols)
+        rows = cursor.fetchall()
+        
+        found = {row['stock_symbol'] for row in rows} | {row['bse_code'] for row in rows}
+        new_ids = list(dict.fromkeys(row['id'] for row in rows if row['watched'] is None))
+        
+        # One transaction for all inserts plus their pending check status
+        with conn:
+            cursor.executemany(
+                "INSERT OR IGNORE INTO watchlist_items (stock_id) VALUES (?)",
+                [(stock_id,) for stock_id in new_ids]
+            )
+            scheduler.mark_checks_pending(conn, new_ids)
+        
+        if new_ids:
+            scheduler.trigger_check_for_stocks(new_ids, status_marked=True)
+        return jsonify({
+            'added': len(new_ids),
+            'not_found': [sym for sym in symbols if sym not in found]
+        }), 201
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 @app.route('/api/watchlist/<symbol>', methods=['DELETE'])
 def remove_from_watchlist(symbol):
@@ -367,7 +575,7 @@ def remove_from_watchlist(symbol):
     
     try:
         # Get stock ID first - check both NSE symbol and BSE code
-        cursor.execute("SELECT id FROM stocks WHERE stock_symbol = ? OR bse_code = ?", (symbol, symbol))
+        cursor.execute(SQL_STOCK_LOOKUP, (symbol, symbol))
         stock = cursor.fetchone()
         
         if stock:
@@ -378,8 +586,6 @@ def remove_from_watchlist(symbol):
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 # Groups API Endpoints
 
@@ -388,16 +594,16 @@ def get_groups():
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    cursor.execute("SELECT * FROM groups ORDER BY created_at DESC")
-    groups = [dict(row) for row in cursor.fetchall()]
-    
-    # Get stock counts for each group
-    for group in groups:
-        cursor.execute("SELECT COUNT(*) FROM group_stocks WHERE group_id = ?", (group['id'],))
-        group['stock_count'] = cursor.fetchone()[0]
-        
-    conn.close()
-    return jsonify(groups)
+    cursor.execute("""
+        SELECT g.*, COUNT(gs.stock_id) AS stock_count
+        FROM groups g
+        LEFT JOIN group_stocks gs ON gs.group_id = g.id
+        GROUP BY g.id
+        ORDER BY g.created_at DESC
+    """)
+    groups = list(_row_dicts(cursor))
+    # Groups are edited from the same UI, so revalidate every time (cheap 304)
+    return _cacheable(jsonify(groups), 'no-cache')
 
 @app.route('/api/groups', methods=['POST'])
 def create_group():
@@ -411,21 +617,37 @@ def create_group():
     cursor = conn.cursor()
     
     try:
-        # Check for duplicate name (case-insensitive)
-        cursor.execute("SELECT id FROM groups WHERE LOWER(name) = LOWER(?)", (name.strip(),))
-        if cursor.fetchone():
-            return jsonify({'error': 'A group with this name already exists'}), 409
-            
+        # Duplicate names (case-insensitive) are rejected by idx_groups_name_nocase
         cursor.execute("""
             INSERT INTO groups (name, deep_research_prompt, stock_summary_prompt, is_active)
             VALUES (?, ?, ?, ?)
         """, (name.strip(), data.get('deep_research_prompt'), data.get('stock_summary_prompt'), data.get('is_active', True)))
         conn.commit()
         return jsonify({'message': 'Group created', 'id': cursor.lastrowid}), 201
+    except sqlite3.IntegrityError:
+        return jsonify({'error': 'A group with this name already exists'}), 409
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
+
+def _partial_update_sql(table, fields):
+    """UPDATE that only overwrites the columns whose flag parameter is 1."""
+    assignments = ', '.join(
+        f"{field} = CASE WHEN ? THEN ? ELSE {field} END" for field in fields
+    )
+    return f"UPDATE {table} SET {assignments} WHERE id = ?"
+
+def _update_params(data, fields):
+    params = []
+    for field in fields:
+        params.extend((field in data, data.get(field)))
+    return tuple(params)
+
+GROUP_UPDATE_FIELDS = ('name', 'deep_research_prompt', 'stock_summary_prompt', 'is_active')
+UPDATE_GROUP_SQL = _partial_update_sql('groups', GROUP_UPDATE_FIELDS)
+EMAIL_UPDATE_FIELDS = ('email', 'name', 'is_active')
+UPDATE_EMAIL_SQL = _partial_update_sql('email_list', EMAIL_UPDATE_FIELDS)
+SMTP_UPDATE_FIELDS = ('email', 'app_password', 'smtp_server', 'smtp_port', 'is_active')
+UPDATE_SMTP_SQL = _partial_update_sql('smtp_settings', SMTP_UPDATE_FIELDS)
 
 @app.route('/api/groups/<int:group_id>', methods=['PATCH'])
 def update_group(group_id):
@@ -434,54 +656,30 @@ def update_group(group_id):
     cursor = conn.cursor()
     
     try:
-        # Check if group exists
-        cursor.execute("SELECT id FROM groups WHERE id = ?", (group_id,))
-        if not cursor.fetchone():
-            return jsonify({'error': 'Group not found'}), 404
-            
-        # Build update query dynamically
-        fields = []
-        values = []
+        # Single fixed UPDATE: each column takes the new value only when its
+        # "provided" flag is set, so SQLite can reuse one cached statement
+        # (and explicit nulls still clear a column)
+        if not any(field in data for field in GROUP_UPDATE_FIELDS):
+            cursor.execute("SELECT id FROM groups WHERE id = ?", (group_id,))
+            if not cursor.fetchone():
+                return jsonify({'error': 'Group not found'}), 404
+            return jsonify({'message': 'No changes provided'}), 200
         
         if 'name' in data:
-            # Check for duplicate name (case-insensitive), excluding current group
-            new_name = data['name'].strip()
-            cursor.execute(
-                "SELECT id FROM groups WHERE LOWER(name) = LOWER(?) AND id != ?", 
-                (new_name, group_id)
-            )
-            if cursor.fetchone():
-                return jsonify({'error': 'A group with this name already exists'}), 409
-            fields.append("name = ?")
-            values.append(new_name)
-            
-        if 'deep_research_prompt' in data:
-            fields.append("deep_research_prompt = ?")
-            values.append(data['deep_research_prompt'])
-            
-        if 'stock_summary_prompt' in data:
-            fields.append("stock_summary_prompt = ?")
-            values.append(data['stock_summary_prompt'])
-            
-        if 'is_active' in data:
-            fields.append("is_active = ?")
-            values.append(data['is_active'])
-            
-        if not fields:
-            return jsonify({'message': 'No changes provided'}), 200
-            
-        values.append(group_id)
-        query = f"UPDATE groups SET {', '.join(fields)} WHERE id = ?"
+            data['name'] = data['name'].strip()
         
-        cursor.execute(query, tuple(values))
+        # Duplicate names (case-insensitive) are rejected by idx_groups_name_nocase
+        cursor.execute(UPDATE_GROUP_SQL, _update_params(data, GROUP_UPDATE_FIELDS) + (group_id,))
+        if cursor.rowcount == 0:
+            return jsonify({'error': 'Group not found'}), 404
         conn.commit()
         
         return jsonify({'message': 'Group updated'}), 200
         
+    except sqlite3.IntegrityError:
+        return jsonify({'error': 'A group with this name already exists'}), 409
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 @app.route('/api/groups/<int:group_id>', methods=['DELETE'])
 def delete_group(group_id):
@@ -489,21 +687,16 @@ def delete_group(group_id):
     cursor = conn.cursor()
     
     try:
-        # Check if group exists
-        cursor.execute("SELECT id FROM groups WHERE id = ?", (group_id,))
-        if not cursor.fetchone():
-            return jsonify({'error': 'Group not found'}), 404
-            
         # Delete group (cascade will handle group_stocks)
         cursor.execute("DELETE FROM groups WHERE id = ?", (group_id,))
+        if cursor.rowcount == 0:
+            return jsonify({'error': 'Group not found'}), 404
         conn.commit()
         
         return jsonify({'message': 'Group deleted'}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 @app.route('/api/groups/<int:group_id>', methods=['GET'])
 def get_group_details(group_id):
@@ -522,7 +715,6 @@ def get_group_details(group_id):
     group = cursor.fetchone()
     
     if not group:
-        conn.close()
         return jsonify({'error': 'Group not found'}), 404
         
     group_data = dict(group)
@@ -532,45 +724,15 @@ def get_group_details(group_id):
     group_data['selected_year'] = year
     
     # Get stocks in group with transcript status for SELECTED QUARTER
-    cursor.execute("""
-        SELECT 
-            s.id,
-            COALESCE(s.stock_symbol, s.bse_code) as symbol, 
-            s.stock_name as name, 
-            gs.added_at,
-            t.quarter,
-            t.year,
-            t.status as transcript_status,
-            t.created_at as transcript_created_at
-        FROM stocks s
-        JOIN group_stocks gs ON s.id = gs.stock_id
-        LEFT JOIN transcripts t ON t.stock_id = s.id 
-            AND t.quarter = ? AND t.year = ?
-        WHERE gs.group_id = ?
-        ORDER BY gs.added_at DESC
-    """, (quarter, year, group_id))
+    cursor.execute(SQL_GROUP_STOCKS, (quarter, year, group_id))
     
-    group_data['stocks'] = [dict(row) for row in cursor.fetchall()]
+    group_data['stocks'] = list(_row_dicts(cursor))
 
-    # Add transcript completion counts for selected quarter
-    try:
-        cursor.execute("""
-            SELECT 
-                COUNT(*) AS total_stocks,
-                SUM(CASE WHEN t.status = 'available' THEN 1 ELSE 0 END) AS transcripts_ready
-            FROM group_stocks gs
-            LEFT JOIN transcripts t 
-                ON t.stock_id = gs.stock_id
-                AND t.quarter = ? AND t.year = ?
-            WHERE gs.group_id = ?
-        """, (quarter, year, group_id))
-        counts = cursor.fetchone()
-        group_data['transcripts_ready'] = counts['transcripts_ready'] if counts['transcripts_ready'] else 0
-        group_data['transcripts_total'] = counts['total_stocks'] if counts else 0
-    except Exception:
-        group_data['transcripts_ready'] = 0
-        group_data['transcripts_total'] = 0
-    conn.close()
+    # Transcript completion counts for selected quarter, from the rows above
+    group_data['transcripts_total'] = len(group_data['stocks'])
+    group_data['transcripts_ready'] = sum(
+        1 for stock in group_data['stocks'] if stock['transcript_status'] == 'available'
+    )
     
     return jsonify(group_data)
 
@@ -587,29 +749,28 @@ def add_stock_to_group(group_id):
     
     try:
         # Get stock ID - check both NSE symbol and BSE code
-        cursor.execute("SELECT id FROM stocks WHERE stock_symbol = ? OR bse_code = ?", (symbol, symbol))
+        cursor.execute(SQL_STOCK_LOOKUP, (symbol, symbol))
         stock = cursor.fetchone()
         
         if not stock:
             return jsonify({'error': 'Stock not found'}), 404
             
-        # Add to group
-        cursor.execute("""
-            INSERT INTO group_stocks (group_id, stock_id)
-            VALUES (?, ?)
-        """, (group_id, stock['id']))
-        conn.commit()
+        # Add to group and mark the transcript check pending in one commit
+        with conn:
+            cursor.execute("""
+                INSERT INTO group_stocks (group_id, stock_id)
+                VALUES (?, ?)
+            """, (group_id, stock['id']))
+            scheduler.mark_check_pending(conn, stock['id'])
 
         # Immediately check for transcripts for newly grouped stock
-        scheduler.trigger_check_for_stock(stock['id'])
+        scheduler.trigger_check_for_stock(stock['id'], status_marked=True)
         return jsonify({'message': 'Stock added to group'}), 201
         
     except sqlite3.IntegrityError:
         return jsonify({'message': 'Stock already in group'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 @app.route('/api/groups/<int:group_id>/stocks/<symbol>', methods=['DELETE'])
 def remove_stock_from_group(group_id, symbol):
@@ -618,7 +779,7 @@ def remove_stock_from_group(group_id, symbol):
     
     try:
         # Get stock ID - check both NSE symbol and BSE code
-        cursor.execute("SELECT id FROM stocks WHERE stock_symbol = ? OR bse_code = ?", (symbol, symbol))
+        cursor.execute(SQL_STOCK_LOOKUP, (symbol, symbol))
         stock = cursor.fetchone()
         
         if stock:
@@ -632,8 +793,6 @@ def remove_stock_from_group(group_id, symbol):
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 @app.route('/api/groups/<int:group_id>/articles', methods=['GET'])
 def list_group_articles(group_id):
@@ -705,8 +864,7 @@ def get_emails():
     else:
         cursor.execute("SELECT * FROM email_list ORDER BY created_at DESC")
     
-    emails = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    emails = list(_row_dicts(cursor))
     return jsonify(emails)
 
 @app.route('/api/emails/<int:email_id>', methods=['GET'])
@@ -716,7 +874,6 @@ def get_email(email_id):
     
     cursor.execute("SELECT * FROM email_list WHERE id = ?", (email_id,))
     email = cursor.fetchone()
-    conn.close()
     
     if not email:
         return jsonify({'error': 'Email not found'}), 404
@@ -746,8 +903,6 @@ def add_email():
         return jsonify({'error': 'Email already exists'}), 409
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 @app.route('/api/emails/<int:email_id>', methods=['PATCH'])
 def update_email(email_id):
@@ -756,34 +911,15 @@ def update_email(email_id):
     cursor = conn.cursor()
     
     try:
-        # Check if email exists
-        cursor.execute("SELECT id FROM email_list WHERE id = ?", (email_id,))
-        if not cursor.fetchone():
-            return jsonify({'error': 'Email not found'}), 404
-            
-        # Build update query dynamically
-        fields = []
-        values = []
-        
-        if 'email' in data:
-            fields.append("email = ?")
-            values.append(data['email'])
-            
-        if 'name' in data:
-            fields.append("name = ?")
-            values.append(data['name'])
-            
-        if 'is_active' in data:
-            fields.append("is_active = ?")
-            values.append(data['is_active'])
-            
-        if not fields:
+        if not any(field in data for field in EMAIL_UPDATE_FIELDS):
+            cursor.execute("SELECT id FROM email_list WHERE id = ?", (email_id,))
+            if not cursor.fetchone():
+                return jsonify({'error': 'Email not found'}), 404
             return jsonify({'message': 'No changes provided'}), 200
-            
-        values.append(email_id)
-        query = f"UPDATE email_list SET {', '.join(fields)} WHERE id = ?"
         
-        cursor.execute(query, tuple(values))
+        cursor.execute(UPDATE_EMAIL_SQL, _update_params(data, EMAIL_UPDATE_FIELDS) + (email_id,))
+        if cursor.rowcount == 0:
+            return jsonify({'error': 'Email not found'}), 404
         conn.commit()
         
         return jsonify({'message': 'Email updated'}), 200
@@ -792,8 +928,6 @@ def update_email(email_id):
         return jsonify({'error': 'Email already exists'}), 409
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 @app.route('/api/emails/<int:email_id>', methods=['DELETE'])
 def delete_email(email_id):
@@ -801,20 +935,15 @@ def delete_email(email_id):
     cursor = conn.cursor()
     
     try:
-        # Check if email exists
-        cursor.execute("SELECT id FROM email_list WHERE id = ?", (email_id,))
-        if not cursor.fetchone():
-            return jsonify({'error': 'Email not found'}), 404
-            
         cursor.execute("DELETE FROM email_list WHERE id = ?", (email_id,))
+        if cursor.rowcount == 0:
+            return jsonify({'error': 'Email not found'}), 404
         conn.commit()
         
         return jsonify({'message': 'Email deleted'}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 # SMTP Settings API Endpoints
 
@@ -830,8 +959,7 @@ def get_smtp_settings():
     else:
         cursor.execute("SELECT * FROM smtp_settings ORDER BY created_at DESC")
     
-    settings = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    settings = list(_row_dicts(cursor))
     return jsonify(settings)
 
 @app.route('/api/smtp-settings/<int:setting_id>', methods=['GET'])
@@ -841,7 +969,6 @@ def get_smtp_setting(setting_id):
     
     cursor.execute("SELECT * FROM smtp_settings WHERE id = ?", (setting_id,))
     setting = cursor.fetchone()
-    conn.close()
     
     if not setting:
         return jsonify({'error': 'SMTP setting not found'}), 404
@@ -861,47 +988,46 @@ def add_smtp_setting():
     cursor = conn.cursor()
     
     try:
-        # If this new setting is active, deactivate all others
-        if data.get('is_active', True):
-            cursor.execute("UPDATE smtp_settings SET is_active = 0")
-            
-        cursor.execute("""
-            INSERT INTO smtp_settings (email, app_password, smtp_server, smtp_port, is_active)
-            VALUES (?, ?, ?, ?, ?)
-        """, (
-            email, 
-            app_password, 
-            data.get('smtp_server', 'smtp.gmail.com'),
-            data.get('smtp_port', 587),
-            data.get('is_active', True)
-        ))
-        conn.commit()
-        return jsonify({'message': 'SMTP setting added', 'id': cursor.lastrowid}), 201
-    except sqlite3.IntegrityError:
-        # If email exists, try to update it instead
-        try:
+        # Deactivate + insert commit together (rolled back together on conflict)
+        with conn:
+            # If this new setting is active, deactivate all others
             if data.get('is_active', True):
                 cursor.execute("UPDATE smtp_settings SET is_active = 0")
                 
             cursor.execute("""
-                UPDATE smtp_settings 
-                SET app_password = ?, smtp_server = ?, smtp_port = ?, is_active = ?
-                WHERE email = ?
+                INSERT INTO smtp_settings (email, app_password, smtp_server, smtp_port, is_active)
+                VALUES (?, ?, ?, ?, ?)
             """, (
-                app_password,
+                email, 
+                app_password, 
                 data.get('smtp_server', 'smtp.gmail.com'),
                 data.get('smtp_port', 587),
-                data.get('is_active', True),
-                email
+                data.get('is_active', True)
             ))
-            conn.commit()
+        return jsonify({'message': 'SMTP setting added', 'id': cursor.lastrowid}), 201
+    except sqlite3.IntegrityError:
+        # If email exists, try to update it instead
+        try:
+            with conn:
+                if data.get('is_active', True):
+                    cursor.execute("UPDATE smtp_settings SET is_active = 0")
+                    
+                cursor.execute("""
+                    UPDATE smtp_settings 
+                    SET app_password = ?, smtp_server = ?, smtp_port = ?, is_active = ?
+                    WHERE email = ?
+                """, (
+                    app_password,
+                    data.get('smtp_server', 'smtp.gmail.com'),
+                    data.get('smtp_port', 587),
+                    data.get('is_active', True),
+                    email
+                ))
             return jsonify({'message': 'SMTP setting updated'}), 200
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 @app.route('/api/smtp-settings/<int:setting_id>', methods=['PATCH'])
 def update_smtp_setting(setting_id):
@@ -910,47 +1036,20 @@ def update_smtp_setting(setting_id):
     cursor = conn.cursor()
     
     try:
-        # Check if setting exists
-        cursor.execute("SELECT id FROM smtp_settings WHERE id = ?", (setting_id,))
-        if not cursor.fetchone():
-            return jsonify({'error': 'SMTP setting not found'}), 404
-            
-        # If setting is being made active, deactivate others
-        if data.get('is_active'):
-            cursor.execute("UPDATE smtp_settings SET is_active = 0")
-            
-        # Build update query dynamically
-        fields = []
-        values = []
-        
-        if 'email' in data:
-            fields.append("email = ?")
-            values.append(data['email'])
-            
-        if 'app_password' in data:
-            fields.append("app_password = ?")
-            values.append(data['app_password'])
-            
-        if 'smtp_server' in data:
-            fields.append("smtp_server = ?")
-            values.append(data['smtp_server'])
-            
-        if 'smtp_port' in data:
-            fields.append("smtp_port = ?")
-            values.append(data['smtp_port'])
-            
-        if 'is_active' in data:
-            fields.append("is_active = ?")
-            values.append(data['is_active'])
-            
-        if not fields:
+        if not any(field in data for field in SMTP_UPDATE_FIELDS):
+            cursor.execute("SELECT id FROM smtp_settings WHERE id = ?", (setting_id,))
+            if not cursor.fetchone():
+                return jsonify({'error': 'SMTP setting not found'}), 404
             return jsonify({'message': 'No changes provided'}), 200
-            
-        values.append(setting_id)
-        query = f"UPDATE smtp_settings SET {', '.join(fields)} WHERE id = ?"
         
-        cursor.execute(query, tuple(values))
-        conn.commit()
+        # Update first (rowcount doubles as the existence check), then deactivate
+        # the others if this one was made active - both in one transaction
+        with conn:
+            cursor.execute(UPDATE_SMTP_SQL, _update_params(data, SMTP_UPDATE_FIELDS) + (setting_id,))
+            if cursor.rowcount == 0:
+                return jsonify({'error': 'SMTP setting not found'}), 404
+            if data.get('is_active'):
+                cursor.execute("UPDATE smtp_settings SET is_active = 0 WHERE id != ?", (setting_id,))
         
         return jsonify({'message': 'SMTP setting updated'}), 200
         
@@ -958,8 +1057,6 @@ def update_smtp_setting(setting_id):
         return jsonify({'error': 'SMTP setting with this email already exists'}), 409
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 @app.route('/api/smtp-settings/<int:setting_id>', methods=['DELETE'])
 def delete_smtp_setting(setting_id):
@@ -967,20 +1064,16 @@ def delete_smtp_setting(setting_id):
     cursor = conn.cursor()
     
     try:
-        # Check if setting exists
-        cursor.execute("SELECT id FROM smtp_settings WHERE id = ?", (setting_id,))
-        if not cursor.fetchone():
-            return jsonify({'error': 'SMTP setting not found'}), 404
-            
-        cursor.execute("DELETE FROM smtp_settings WHERE id = ?", (setting_id,))
+        cursor.execute("DELETE FROM smtp_settings WHERE id = ? RETURNING id", (setting_id,))
+        deleted = cursor.fetchone()
         conn.commit()
+        if not deleted:
+            return jsonify({'error': 'SMTP setting not found'}), 404
         
         return jsonify({'message': 'SMTP setting deleted'}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 # SMTP Email Functionality
 
@@ -1029,17 +1122,20 @@ def send_email():
     subject = data.get('subject')
     body = data.get('body')
     
-    if not all([to_email, subject, body]):
+    if not to_email or not subject or not body:
         return jsonify({'error': 'Missing required fields: to, subject, body'}), 400
     
     try:
-        email_service.send_email(
+        # Fail fast on missing config; the actual send happens on the mail executor
+        if not email_service.get_active_smtp_config():
+            raise ValueError("No active SMTP configuration found")
+        email_service.send_email_async(
             to_email=to_email,
             subject=subject,
             body=body,
             is_html=data.get('is_html', False)
         )
-        return jsonify({'message': 'Email sent successfully'}), 200
+        return jsonify({'message': 'Email queued'}), 202
         
     except ValueError as e:
         return jsonify({'error': str(e)}), 404
@@ -1091,27 +1187,47 @@ Management maintains positive outlook with guided revenue growth of 15-18% for F
 
 *This is a sample analysis for demonstration purposes.*"""
         
-        # Send to all active recipients
+        def send_batch(batch):
+            # One SMTP login per worker, reused for every recipient in its batch
+            failures = {}
+            with email_service.smtp_session() as session:
+                for email in batch:
+                    try:
+                        email_service.send_analysis_email(
+                            to_email=email,
+                            stock_symbol="AARTIIND",
+                            stock_name="Aarti Industries Limited",
+                            quarter="Q2",
+                            year=2026,
+                            analysis_content=sample_analysis,
+                            model_provider="Google AI",
+                            model_name="gemini-2.0-flash-exp",
+                            transcript_url="https://stockdiscovery.s3.amazonaws.com/insight/india/2619/Conference Call/CC-Jun25.pdf",
+                            session=session
+                        )
+                    except Exception as e:
+                        failures[email] = e
+            return failures
+
+        # Send to all active recipients in parallel (each send is SMTP round trips)
         sent_count = 0
         errors = []
-        for email in email_list:
-            try:
-                email_service.send_analysis_email(
-                    to_email=email,
-                    stock_symbol="AARTIIND",
-                    stock_name="Aarti Industries Limited",
-                    quarter="Q2",
-                    year=2026,
-                    analysis_content=sample_analysis,
-                    model_provider="Google AI",
-                    model_name="gemini-2.0-flash-exp",
-                    transcript_url="https://stockdiscovery.s3.amazonaws.com/insight/india/2619/Conference Call/CC-Jun25.pdf"
-                )
-                sent_count += 1
-            except Exception as e:
-                error_msg = f"Failed to send to {email}: {str(e)}"
-                print(error_msg)
-                errors.append(error_msg)
+        workers = min(8, len(email_list))
+        batches = [email_list[i::workers] for i in range(workers)]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(send_batch, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    failures = future.result()
+                except Exception as e:
+                    # Couldn't even log in; every recipient in the batch failed
+                    failures = {email: e for email in batch}
+                sent_count += len(batch) - len(failures)
+                for email, e in failures.items():
+                    error_msg = f"Failed to send to {email}: {str(e)}"
+                    print(error_msg)
+                    errors.append(error_msg)
         
         response = {
             'message': f'Test analysis email sent to {sent_count} recipient(s)',
@@ -1136,9 +1252,7 @@ llm_service = LLMService()
 @app.route('/api/llm/providers', methods=['GET'])
 def get_llm_providers():
     """Get all LLM providers and their status."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
+    cursor = get_db_connection().cursor()
     cursor.execute("""
         SELECT id, provider_name, display_name, is_active, 
                (api_key_encrypted IS NOT NULL AND api_key_encrypted != '') as has_key
@@ -1146,10 +1260,7 @@ def get_llm_providers():
         ORDER BY display_name
     """)
     
-    providers = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    
-    return jsonify(providers)
+    return jsonify(list(_row_dicts(cursor)))
 
 @app.route('/api/llm/providers/<provider_name>/key', methods=['POST'])
 def set_provider_key(provider_name):
@@ -1180,43 +1291,36 @@ def get_llm_models():
     """Get all available LLM models."""
     provider_name = request.args.get('provider')
     try:
-        models = llm_service.get_available_models(provider_name)
-        return jsonify(models)
+        return jsonify(llm_service.get_available_models(provider_name))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/llm/settings', methods=['GET'])
 def get_llm_settings():
     """Get global LLM settings."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
+    cursor = get_db_connection().cursor()
     cursor.execute("SELECT setting_key, setting_value FROM llm_settings")
-    settings = {row['setting_key']: row['setting_value'] for row in cursor.fetchall()}
-    conn.close()
     
-    return jsonify(settings)
+    return jsonify({row['setting_key']: row['setting_value'] for row in cursor.fetchall()})
+
+UPSERT_LLM_SETTING_SQL = """
+    INSERT OR REPLACE INTO llm_settings (setting_key, setting_value, updated_at)
+    VALUES (?, ?, CURRENT_TIMESTAMP)
+"""
 
 @app.route('/api/llm/settings', methods=['POST'])
 def update_llm_settings():
     """Update global LLM settings."""
     data = request.json
     conn = get_db_connection()
-    cursor = conn.cursor()
     
     try:
-        for key, value in data.items():
-            cursor.execute("""
-                INSERT OR REPLACE INTO llm_settings (setting_key, setting_value, updated_at)
-                VALUES (?, ?, CURRENT_TIMESTAMP)
-            """, (key, str(value)))
-            
-        conn.commit()
+        rows = [(key, str(value)) for key, value in data.items()]
+        with conn:
+            conn.executemany(UPSERT_LLM_SETTING_SQL, rows)
         return jsonify({'message': 'Settings updated'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 
 # Default Prompt Endpoints
@@ -1254,15 +1358,15 @@ def update_default_prompt():
         return jsonify({'message': 'Default prompt updated'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 
 # Analysis API Endpoints
 
-from services.analysis_worker import AnalysisWorker
+from services.analysis_worker import get_analysis_worker
+
+analysis_worker = get_analysis_worker()
 
-analysis_worker = AnalysisWorker()
+_TRUTHY = frozenset({'1', 'true', 'yes', 'y', 'on'})
 
 @app.route('/api/analyze/<int:stock_id>', methods=['POST'])
 def trigger_analysis(stock_id):
@@ -1271,12 +1375,8 @@ def trigger_analysis(stock_id):
     quarter = data.get('quarter') or request.args.get('quarter')
     year_param = data.get('year') if 'year' in data else request.args.get('year', type=int)
     force_raw = data.get('force') if 'force' in data else request.args.get('force')
-    if isinstance(force_raw, bool):
-        force = force_raw
-    elif force_raw is None:
-        force = False
-    else:
-        force = str(force_raw).strip().lower() in {'1', 'true', 'yes', 'y', 'on'}
+    # bools stringify to 'True'/'False' and None to 'None', so one lookup covers every type
+    force = str(force_raw).strip().lower() in _TRUTHY
     year = None
 
     if year_param is not None:
@@ -1296,49 +1396,49 @@ def trigger_analysis(stock_id):
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    # Verify stock exists
-    cursor.execute("SELECT id FROM stocks WHERE id = ?", (stock_id,))
-    if not cursor.fetchone():
-        conn.close()
+    # Stock existence, watchlist/group membership and the target transcript in one query
+    cursor.execute("""
+        SELECT
+            s.id,
+            EXISTS(SELECT 1 FROM watchlist_items WHERE stock_id = s.id) AS in_watchlist,
+            EXISTS(
+                SELECT 1
+                FROM group_stocks gs
+                JOIN groups g ON g.id = gs.group_id
+                WHERE gs.stock_id = s.id AND g.is_active = 1
+            ) AS in_active_group,
+            t.id AS transcript_id,
+            t.status AS transcript_status,
+            t.source_url,
+            t.analysis_status
+        FROM stocks s
+        LEFT JOIN transcripts t ON t.stock_id = s.id AND t.quarter = ? AND t.year = ?
+        WHERE s.id = ?
+    """, (quarter, year, stock_id))
+    stock = cursor.fetchone()
+    if not stock:
         return jsonify({'error': 'Stock not found'}), 404
 
     # Stock-level analysis is only allowed for watchlist stocks
-    cursor.execute("SELECT 1 FROM watchlist_items WHERE stock_id = ? LIMIT 1", (stock_id,))
-    if cursor.fetchone() is None:
-        conn.close()
+    if not stock['in_watchlist']:
         return jsonify({'error': 'Stock is not in watchlist; stock-level analysis is disabled'}), 409
 
     # Skip stock-level analysis for stocks that belong to an active group
-    cursor.execute("""
-        SELECT 1
-        FROM group_stocks gs
-        JOIN groups g ON g.id = gs.group_id
-        WHERE gs.stock_id = ? AND g.is_active = 1
-        LIMIT 1
-    """, (stock_id,))
-    if cursor.fetchone():
-        conn.close()
+    if stock['in_active_group']:
         return jsonify({'error': 'Stock belongs to an active group; use group research instead'}), 409
 
     # If targeting a specific quarter/year, verify transcript is available
     if quarter and year:
-        cursor.execute("""
-            SELECT id, status, source_url FROM transcripts 
-            WHERE stock_id = ? AND quarter = ? AND year = ?
-            LIMIT 1
-        """, (stock_id, quarter, year))
-        transcript = cursor.fetchone()
-        if not transcript:
-            conn.close()
+        if stock['transcript_id'] is None:
             return jsonify({'error': f'Transcript for {quarter} {year} not found'}), 404
-        if transcript['status'] != 'available':
-            conn.close()
-            return jsonify({'error': f'Transcript status is {transcript["status"]}, cannot analyze'}), 422
-        if not transcript['source_url']:
-            conn.close()
+        if stock['transcript_status'] != 'available':
+            return jsonify({'error': f'Transcript status is {stock["transcript_status"]}, cannot analyze'}), 422
+        if not stock['source_url']:
             return jsonify({'error': f'Transcript for {quarter} {year} has no source_url to analyze'}), 422
+        # The worker would skip it; say so instead of reporting a started job
+        if stock['analysis_status'] == 'in_progress' and not force:
+            return jsonify({'error': f'Analysis for {quarter} {year} is already in progress'}), 409
 
-    conn.close()
     
     # Start background job
     try:
@@ -1373,13 +1473,219 @@ def get_analyses(stock_id):
             ORDER BY ta.created_at DESC
         """, (stock_id,))
         
-        analyses = [dict(row) for row in cursor.fetchall()]
-        return jsonify(analyses)
+        # llm_output makes these rows large; stream them off the cursor
+        return _stream_json_array(_row_dicts(cursor))
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
+
+# Leading whitespace of a pipe-table row (a line that starts with "|" and has a
+# second "|"); match.end() is where the stripped row begins
+_TABLE_ROW_RE = re.compile(r'\s*(?=\|.*\|)')
+
+def _normalize_markdown(text: str) -> str:
+    cleaned_lines = []
+    in_table = False
+    for line in (text or "").splitlines():
+        match = _TABLE_ROW_RE.match(line)
+
+        if match:
+            if not in_table:
+                if cleaned_lines and cleaned_lines[-1].strip():
+                    cleaned_lines.append("")
+                in_table = True
+            cleaned_lines.append(line[match.end():])
+            continue
+
+        if in_table:
+            if cleaned_lines and cleaned_lines[-1].strip():
+                cleaned_lines.append("")
+            in_table = False
+        cleaned_lines.append(line)
+
+    return "\n".join(cleaned_lines)
+
+# Building a Markdown instance loads and configures every extension, so each
+# thread keeps one (instances aren't thread-safe) and resets it per document.
+_markdown_local = threading.local()
+
+def _markdown_converter():
+    md = getattr(_markdown_local, 'md', None)
+    if md is None:
+        md = _markdown_local.md = markdown.Markdown(
+            extensions=['extra', 'tables', 'sane_lists', 'nl2br']
+        )
+    return md
+
+# Analysis rows are immutable once written, so the rendered HTML is cached per
+# (analysis id, content); repeat downloads skip the markdown parse entirely.
+@lru_cache(maxsize=256)
+def _render_analysis_markdown(analysis_id, text):
+    return _markdown_converter().reset().convert(_normalize_markdown(text))
+
+# Static stylesheet for analysis PDFs, built once instead of per request
+ANALYSIS_PDF_CSS = """
+    @page {
+        size: A4;
+        margin: 28pt 32pt;
+    }
+    body {
+        font-family: "Helvetica", "Arial", sans-serif;
+        font-size: 11pt;
+        color: #111;
+        line-height: 1.55;
+    }
+    .header {
+        border-bottom: 1px solid #ccc;
+        padding-bottom: 10pt;
+        margin-bottom: 12pt;
+    }
+    .title {
+        font-size: 16pt;
+        font-weight: 700;
+        margin: 0;
+    }
+    .meta {
+        font-size: 9pt;
+        color: #555;
+        margin-top: 4pt;
+    }
+    h1, h2, h3, h4, h5, h6 {
+        margin-top: 14pt;
+        margin-bottom: 8pt;
+        color: #0f172a;
+    }
+    p {
+        margin: 8pt 0;
+    }
+    ul, ol {
+        margin: 8pt 0 8pt 18pt;
+    }
+    li {
+        margin: 4pt 0;
+    }
+    table {
+        width: 100%;
+        border-collapse: collapse;
+        table-layout: fixed;
+        margin: 12pt 0;
+        font-size: 10pt;
+    }
+    th, td {
+        border: 1px solid #d5d7db;
+        padding: 6pt 8pt;
+        word-wrap: break-word;
+        vertical-align: top;
+    }
+    th {
+        background: #f3f4f6;
+        font-weight: 700;
+        text-align: left;
+    }
+    tr:nth-child(even) td {
+        background: #fafafa;
+    }
+    pre, code {
+        font-family: "Consolas", "Courier New", monospace;
+        background: #f8fafc;
+        padding: 6pt;
+        border-radius: 4pt;
+        white-space: pre-wrap;
+        word-wrap: break-word;
+        display: block;
+    }
+    /* Constrain excessive columns from overflowing the page */
+    table thead tr th,
+    table tbody tr td {
+        max-width: 160pt;
+    }
+"""
+
+# Outer HTML for analysis PDFs; only the per-analysis fields are substituted
+ANALYSIS_PDF_TEMPLATE = """
+<html>
+<head>
+    <meta charset="UTF-8">
+    <style>{css}</style>
+</head>
+<body>
+    <div class="header">
+        <div class="title">{stock_name} ({symbol})</div>
+        <div class="meta">Quarter: {quarter} {year}</div>
+        <div class="meta">Model: {model_name} | Provider: {provider}</div>
+        <div class="meta">Generated: {generated_at}</div>
+        <div class="meta">Transcript: {transcript_url}</div>
+    </div>
+    <div class="content">
+        {content}
+    </div>
+</body>
+</html>
+"""
+
+# Fallback header values for ANALYSIS_PDF_TEMPLATE, escaped once
+DEFAULT_PDF_PROVIDER = html.escape('LLM')
+DEFAULT_PDF_TRANSCRIPT_URL = html.escape('#')
+
+_FILENAME_SAFE_CHARS = frozenset(string.ascii_letters + string.digits + '-_')
+
+# xhtml2pdf is CPU-bound and slow; renders run on bounded pools so a burst of
+# downloads can't tie up every request thread. Analysis PDFs go to
+# get_pdf_render_pool(); research PDFs need the DB, so they stay on threads here.
+# Callers passing ?async=1 get a 202 with a job id and poll /api/pdf/<job_id>.
+PDF_EXECUTOR = ThreadPoolExecutor(max_workers=os.cpu_count() or 2, thread_name_prefix='pdf-research')
+
+# In-process job map; gunicorn runs a single worker (gunicorn.conf.py), so the poll
+# always reaches the process that queued the job. Jobs nobody collects within the
+# TTL are dropped along with their PDF bytes.
+PDF_JOB_TTL_SECONDS = 600
+_pdf_jobs = {}  # job_id -> (future, filename, queued_at)
+_pdf_jobs_lock = threading.Lock()
+
+def _evict_expired_pdf_jobs(now):
+    # Caller holds _pdf_jobs_lock
+    for job_id, (future, _, queued_at) in list(_pdf_jobs.items()):
+        if now - queued_at > PDF_JOB_TTL_SECONDS:
+            future.cancel()  # no-op if it already started
+            del _pdf_jobs[job_id]
+
+def _pdf_response(pdf, filename):
+    # A path (cached research PDFs) is streamed from disk via send_file
+    if isinstance(pdf, str):
+        return send_file(pdf, mimetype='application/pdf', as_attachment=True, download_name=filename)
+    response = Response(pdf, mimetype='application/pdf')
+    response.headers['Content-Disposition'] = f'attachment; filename=\"{filename}\"'
+    return response
+
+def _queue_pdf_job(future, filename):
+    job_id = uuid.uuid4().hex
+    now = time.monotonic()
+    with _pdf_jobs_lock:
+        _evict_expired_pdf_jobs(now)
+        _pdf_jobs[job_id] = (future, filename, now)
+    return jsonify({'job_id': job_id, 'url': f'/api/pdf/{job_id}'}), 202
+
+@app.route('/api/pdf/<job_id>', methods=['GET'])
+def get_pdf_job(job_id):
+    with _pdf_jobs_lock:
+        _evict_expired_pdf_jobs(time.monotonic())
+        job = _pdf_jobs.get(job_id)
+        if not job:
+            return jsonify({'error': 'PDF job not found'}), 404
+
+        future, filename, _ = job
+        if not future.done():
+            return jsonify({'status': 'pending'}), 202
+
+        # Finished jobs are handed out once
+        del _pdf_jobs[job_id]
+    try:
+        pdf = future.result()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    if not pdf:
+        return jsonify({'error': 'PDF not available'}), 404
+    return _pdf_response(pdf, filename)
 
 @app.route('/api/analyses/<int:stock_id>/download', methods=['GET'])
 def download_latest_analysis(stock_id):
@@ -1401,6 +1707,7 @@ def download_latest_analysis(stock_id):
         params = [stock_id]
         query = """
             SELECT 
+                ta.id,
                 ta.llm_output,
                 ta.created_at,
                 ta.model_provider,
@@ -1431,32 +1738,8 @@ def download_latest_analysis(stock_id):
                 return jsonify({'error': f'No analysis found for {quarter} {year}'}), 404
             return jsonify({'error': 'No analysis found for this stock'}), 404
 
-        def normalize_markdown(text: str) -> str:
-            cleaned_lines = []
-            in_table = False
-            for line in (text or "").splitlines():
-                stripped = line.lstrip()
-                is_table_row = stripped.startswith("|") and stripped.count("|") >= 2
-
-                if is_table_row and not in_table:
-                    if cleaned_lines and cleaned_lines[-1].strip():
-                        cleaned_lines.append("")
-                    in_table = True
-                elif not is_table_row and in_table:
-                    if cleaned_lines and cleaned_lines[-1].strip():
-                        cleaned_lines.append("")
-                    in_table = False
-
-                cleaned_lines.append(stripped if is_table_row else line)
-
-            return "\n".join(cleaned_lines)
-
-        normalized = normalize_markdown(analysis['llm_output'])
         try:
-            rendered_content = markdown.markdown(
-                normalized,
-                extensions=['extra', 'tables', 'sane_lists', 'nl2br']
-            )
+            rendered_content = _render_analysis_markdown(analysis['id'], analysis['llm_output'])
         except Exception:
             rendered_content = f"<pre>{html.escape(analysis['llm_output'] or '')}</pre>"
 
@@ -1464,125 +1747,39 @@ def download_latest_analysis(stock_id):
         stock_name = analysis['stock_name'] or symbol
         quarter = analysis['quarter']
         year = analysis['year']
-        provider = (analysis['model_provider'] or 'LLM').upper()
-        model_name_value = str(analysis['model_id']) if analysis['model_id'] is not None else provider
-        transcript_url = analysis['source_url'] or '#'
-
-        generated_at = str(analysis['created_at'])
-        html_body = f"""
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <style>
-                @page {{
-                    size: A4;
-                    margin: 28pt 32pt;
-                }}
-                body {{
-                    font-family: "Helvetica", "Arial", sans-serif;
-                    font-size: 11pt;
-                    color: #111;
-                    line-height: 1.55;
-                }}
-                .header {{
-                    border-bottom: 1px solid #ccc;
-                    padding-bottom: 10pt;
-                    margin-bottom: 12pt;
-                }}
-                .title {{
-                    font-size: 16pt;
-                    font-weight: 700;
-                    margin: 0;
-                }}
-                .meta {{
-                    font-size: 9pt;
-                    color: #555;
-                    margin-top: 4pt;
-                }}
-                h1, h2, h3, h4, h5, h6 {{
-                    margin-top: 14pt;
-                    margin-bottom: 8pt;
-                    color: #0f172a;
-                }}
-                p {{
-                    margin: 8pt 0;
-                }}
-                ul, ol {{
-                    margin: 8pt 0 8pt 18pt;
-                }}
-                li {{
-                    margin: 4pt 0;
-                }}
-                table {{
-                    width: 100%;
-                    border-collapse: collapse;
-                    table-layout: fixed;
-                    margin: 12pt 0;
-                    font-size: 10pt;
-                }}
-                th, td {{
-                    border: 1px solid #d5d7db;
-                    padding: 6pt 8pt;
-                    word-wrap: break-word;
-                    vertical-align: top;
-                }}
-                th {{
-                    background: #f3f4f6;
-                    font-weight: 700;
-                    text-align: left;
-                }}
-                tr:nth-child(even) td {{
-                    background: #fafafa;
-                }}
-                pre, code {{
-                    font-family: "Consolas", "Courier New", monospace;
-                    background: #f8fafc;
-                    padding: 6pt;
-                    border-radius: 4pt;
-                    white-space: pre-wrap;
-                    word-wrap: break-word;
-                    display: block;
-                }}
-                /* Constrain excessive columns from overflowing the page */
-                table thead tr th,
-                table tbody tr td {{
-                    max-width: 160pt;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <div class="title">{html.escape(stock_name)} ({html.escape(symbol)})</div>
-                <div class="meta">Quarter: {html.escape(quarter)} {html.escape(str(year))}</div>
-                <div class="meta">Model: {html.escape(model_name_value)} | Provider: {html.escape(provider)}</div>
-                <div class="meta">Generated: {html.escape(generated_at)}</div>
-                <div class="meta">Transcript: {html.escape(transcript_url)}</div>
-            </div>
-            <div class="content">
-                {rendered_content}
-            </div>
-        </body>
-        </html>
-        """
+        provider = (
+            html.escape(analysis['model_provider'].upper())
+            if analysis['model_provider'] else DEFAULT_PDF_PROVIDER
+        )
+        model_name_value = html.escape(str(analysis['model_id'])) if analysis['model_id'] is not None else provider
+        transcript_url = html.escape(analysis['source_url']) if analysis['source_url'] else DEFAULT_PDF_TRANSCRIPT_URL
+
+        html_body = ANALYSIS_PDF_TEMPLATE.format(
+            css=ANALYSIS_PDF_CSS,
+            content=rendered_content,
+            stock_name=html.escape(stock_name),
+            symbol=html.escape(symbol),
+            quarter=html.escape(quarter),
+            year=html.escape(str(year)),
+            model_name=model_name_value,
+            provider=provider,
+            generated_at=html.escape(str(analysis['created_at'])),
+            transcript_url=transcript_url,
+        )
 
-        safe_symbol = "".join([c if c.isalnum() or c in ['-', '_'] else '_' for c in symbol])
+        safe_symbol = "".join(c if c in _FILENAME_SAFE_CHARS else '_' for c in symbol)
         filename = f"{safe_symbol}_{quarter}_{year}_analysis.pdf"
 
-        # Render HTML to PDF
-        pdf_buffer = BytesIO()
-        pdf_result = pisa.CreatePDF(html_body, dest=pdf_buffer)
+        # Done with the DB; hand the connection back before waiting on the render
+        _pool.put(g.pop('db_conn'))
 
-        if pdf_result.err:
-            return jsonify({'error': 'Failed to generate PDF'}), 500
-
-        pdf_buffer.seek(0)
-        response = Response(pdf_buffer.getvalue(), mimetype='application/pdf')
-        response.headers['Content-Disposition'] = f'attachment; filename=\"{filename}\"'
-        return response
+        # Render HTML to PDF in the render worker processes
+        future = get_pdf_render_pool().submit(render_pdf, html_body)
+        if request.args.get('async'):
+            return _queue_pdf_job(future, filename)
+        return _pdf_response(future.result(), filename)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 # API Key Management Endpoints
 
@@ -1760,18 +1957,20 @@ def get_research_run(run_id):
 def download_research_pdf(run_id):
     """Download research run as PDF"""
     try:
-        pdf_content = document_research_service.generate_pdf(run_id)
-        if not pdf_content:
-            return jsonify({'error': 'PDF not available'}), 404
-        
         run = document_research_service.get_run(run_id)
+        if not run:
+            return jsonify({'error': 'PDF not available'}), 404
         filename = f"{run.get('stock_symbol', 'research')}-annual-report-analysis.pdf"
         
-        return Response(
-            pdf_content,
-            mimetype='application/pdf',
-            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
-        )
+        future = PDF_EXECUTOR.submit(document_research_service.generate_pdf_file, run_id)
+        if request.args.get('async'):
+            return _queue_pdf_job(future, filename)
+        
+        pdf_path = future.result()
+        if not pdf_path:
+            return jsonify({'error': 'PDF not available'}), 404
+        
+        return _pdf_response(pdf_path, filename)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
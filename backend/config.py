@@ -5,10 +5,13 @@ import os
 import sys
 import shutil
 import sqlite3
+import threading
+import time
 from typing import Optional
-from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 
+@lru_cache(maxsize=1)
 def get_base_dir():
     """Get base directory for bundled resources (read-only in frozen mode)"""
     if getattr(sys, 'frozen', False):
@@ -18,6 +21,7 @@ def get_base_dir():
         # Running in development
         return Path(__file__).parent.parent
 
+@lru_cache(maxsize=1)
 def get_user_data_dir():
     """Get user-writable data directory for database and logs"""
     if getattr(sys, 'frozen', False):
@@ -47,6 +51,11 @@ BUNDLED_SCHEMA_PATH = BUNDLED_DATABASE_DIR / "schema.sql"
 # User data (writable) - this is where the actual database lives
 DATABASE_DIR = USER_DATA_DIR / "database"
 DATABASE_PATH = DATABASE_DIR / "stocks.db"
+DATABASE_PATH_STR = str(DATABASE_PATH)  # for per-connection callers; skips os.fspath each time
+
+# Memory-mapped reads (SQLite caps this at the file size); off on 32-bit builds
+# where 256MB of address space per connection is too much to ask
+SQLITE_MMAP_SIZE = 268435456 if sys.maxsize > 2**32 else 0
 SCHEMA_PATH = DATABASE_DIR / "schema.sql"
 
 # CSV file paths (read from bundle, these are read-only which is fine)
@@ -60,11 +69,37 @@ LOG_FILE = LOG_DIR / "app.log"
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 LOG_LEVEL = "INFO"
 
-def _looks_like_database(db_path: Path) -> bool:
+# Rendered research PDFs, reused across downloads (runs don't change once done)
+PDF_CACHE_DIR = USER_DATA_DIR / "cache" / "pdf"
+
+def _copy_database(src: Path, dst: Path):
+    """Copy a database file with the OS fast path, keeping timestamps like copy2."""
+    # shutil.copy2 already uses sendfile (Linux) / fcopyfile (macOS); on Windows
+    # it falls back to a userspace read/write loop, so hand the copy to the kernel
+    if sys.platform == 'win32':
+        try:
+            import ctypes
+            if ctypes.windll.kernel32.CopyFileW(str(src), str(dst), False):
+                return
+        except Exception:
+            pass
+    shutil.copy2(src, dst)
+
+_SQLITE_HEADER = b"SQLite format 3\x00"
+
+def _looks_like_database(db_path: Path, st: Optional[os.stat_result] = None) -> bool:
     try:
-        if not db_path.exists():
+        if st is None:
+            st = os.stat(db_path)
+        # Fast reject before opening SQLite: a database holding any table is at
+        # least two pages, and every database file starts with the magic header
+        if st.st_size < 1024:
             return False
-        conn = sqlite3.connect(db_path)
+        with open(db_path, 'rb') as f:
+            if f.read(len(_SQLITE_HEADER)) != _SQLITE_HEADER:
+                return False
+        # Read-only: probing another app's database must never modify it
+        conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
         cursor = conn.cursor()
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='stocks'")
         ok = cursor.fetchone() is not None
@@ -117,55 +152,118 @@ def _legacy_db_candidates() -> list[Path]:
     return candidates
 
 def _find_legacy_db() -> Optional[Path]:
-    candidates = [p for p in _legacy_db_candidates() if p.exists()]
-    valid = [p for p in candidates if _looks_like_database(p)]
+    # One stat per candidate, reused for the size check and the mtime ordering
+    valid = []
+    for path in _legacy_db_candidates():
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if _looks_like_database(path, st):
+            valid.append((st.st_mtime, path))
     if not valid:
         return None
-    valid.sort(key=lambda p: p.stat().st_mtime, reverse=True)
-    return valid[0]
+    return max(valid, key=lambda item: item[0])[1]
+
+_migration_conn: Optional[sqlite3.Connection] = None
+
+def _open_migration_conn() -> sqlite3.Connection:
+    """Connection shared by the startup migrations below (opened on first use).
+
+    Autocommit mode (isolation_level=None) so each helper opens one explicit
+    transaction around all of its writes; otherwise every DDL statement commits
+    (and fsyncs) on its own. WAL + synchronous=NORMAL keep those commits cheap.
+    The helpers run one after another (seed cleanup on the importing thread,
+    the rest on the migration thread), never concurrently.
+    """
+    global _migration_conn
+    if _migration_conn is None:
+        conn = sqlite3.connect(DATABASE_PATH, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA cache_size = -8000")
+        conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+        conn.execute("PRAGMA foreign_keys = ON")
+        _migration_conn = conn
+    return _migration_conn
+
+def _release_migration_conn(conn: sqlite3.Connection):
+    # Helpers hand the connection back instead of closing it; drop anything a
+    # failed helper left uncommitted so the next one starts clean
+    if conn.in_transaction:
+        conn.rollback()
+
+def _close_migration_conn():
+    global _migration_conn
+    if _migration_conn is not None:
+        try:
+            _migration_conn.execute("PRAGMA optimize")
+        finally:
+            _migration_conn.close()
+            _migration_conn = None
+
+def _begin_migration(cursor: sqlite3.Cursor):
+    """Open the single write transaction a migration helper batches its statements into."""
+    cursor.execute("BEGIN IMMEDIATE")
+    # Check foreign keys once at COMMIT rather than after every statement
+    cursor.execute("PRAGMA defer_foreign_keys = ON")
 
 def _clear_seeded_data():
+    if not DATABASE_PATH.exists():
+        return
+    conn = _open_migration_conn()
     try:
-        if not DATABASE_PATH.exists():
-            return
-        conn = sqlite3.connect(DATABASE_PATH)
-        conn.execute("PRAGMA foreign_keys = ON")
         cursor = conn.cursor()
+        _begin_migration(cursor)
         cursor.execute("DELETE FROM watchlist_items")
         cursor.execute("DELETE FROM group_stocks")
         cursor.execute("UPDATE groups SET is_active = 0")
         conn.commit()
-        conn.close()
         print("[Config] Cleared seeded watchlist/groups from bundled DB")
     except Exception as e:
         print(f"[Config] Seed cleanup failed: {e}")
+    finally:
+        _release_migration_conn(conn)
+
+# Whether the user database exists; set once by initialize_user_data() so the
+# migration helpers don't each re-stat the file
+_DB_PRESENT = False
 
 def initialize_user_data():
     """Copy bundled database to user data directory if it doesn't exist"""
+    global _DB_PRESENT
     # Create directories
     DATABASE_DIR.mkdir(parents=True, exist_ok=True)
     LOG_DIR.mkdir(parents=True, exist_ok=True)
     
     # Copy database if it doesn't exist in user data
-    if not DATABASE_PATH.exists():
+    if not os.path.exists(DATABASE_PATH_STR):
         legacy_db = _find_legacy_db()
         if legacy_db:
             print(f"[Config] Migrating legacy database from {legacy_db}")
-            shutil.copy2(legacy_db, DATABASE_PATH)
-        elif BUNDLED_DATABASE_PATH.exists():
+            _copy_database(legacy_db, DATABASE_PATH)
+        elif os.path.exists(BUNDLED_DATABASE_PATH):
             print(f"[Config] Copying database to {DATABASE_PATH}")
-            shutil.copy2(BUNDLED_DATABASE_PATH, DATABASE_PATH)
+            _copy_database(BUNDLED_DATABASE_PATH, DATABASE_PATH)
             _clear_seeded_data()
         else:
             print(f"[Config] WARNING: Bundled database not found at {BUNDLED_DATABASE_PATH}")
     
     # Copy schema if it doesn't exist
-    if not SCHEMA_PATH.exists():
-        if BUNDLED_SCHEMA_PATH.exists():
+    if not os.path.exists(SCHEMA_PATH):
+        if os.path.exists(BUNDLED_SCHEMA_PATH):
             shutil.copy2(BUNDLED_SCHEMA_PATH, SCHEMA_PATH)
 
+    _DB_PRESENT = os.path.exists(DATABASE_PATH_STR)
+
 _migrations_ran = False
 
+# Bump when ensure_schema_migrations gains a step (stored in PRAGMA user_version)
+SCHEMA_VERSION = 1
+# Bump when ensure_data_migrations gains a fix (stored in the meta table)
+DATA_VERSION = 1
+
 def ensure_schema_migrations():
     """Apply additive schema updates for existing user databases."""
     global _migrations_ran
@@ -173,22 +271,27 @@ def ensure_schema_migrations():
         return
     _migrations_ran = True
 
-    if not DATABASE_PATH.exists():
+    if not _DB_PRESENT:
         return
 
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.execute("PRAGMA foreign_keys = ON")
+    conn = _open_migration_conn()
     cursor = conn.cursor()
     try:
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='transcripts'")
-        if not cursor.fetchone():
+        # Already migrated: skip the introspection entirely
+        cursor.execute("PRAGMA user_version")
+        if cursor.fetchone()[0] >= SCHEMA_VERSION:
+            return
+
+        # One pass over sqlite_master for every table check below
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        tables = {row[0] for row in cursor.fetchall()}
+        if 'transcripts' not in tables:
             return
 
         cursor.execute("PRAGMA table_info(transcripts)")
         columns = {row[1] for row in cursor.fetchall()}
 
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='transcript_checks'")
-        transcript_checks_exists = cursor.fetchone() is not None
+        transcript_checks_exists = 'transcript_checks' in tables
 
         missing_analysis_status = 'analysis_status' not in columns
         missing_analysis_error = 'analysis_error' not in columns
@@ -196,17 +299,25 @@ def ensure_schema_migrations():
         missing_transcript_checks = not transcript_checks_exists
 
         if not (missing_analysis_status or missing_analysis_error or missing_updated_at or missing_transcript_checks):
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
             return
 
         backup_dir = DATABASE_DIR / "backups"
         backup_dir.mkdir(parents=True, exist_ok=True)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_path = backup_dir / f"stocks_backup_{timestamp}.db"
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
+        backup_path = backup_dir / f"stocks_backup_{timestamp}_{os.getpid()}.db"
+        # Online backup instead of a file copy: with WAL the main file alone can be
+        # missing recently committed pages
         try:
-            shutil.copy2(DATABASE_PATH, backup_path)
+            backup_conn = sqlite3.connect(backup_path)
+            try:
+                conn.backup(backup_conn)
+            finally:
+                backup_conn.close()
         except Exception as backup_error:
             print(f"[Config] Backup failed before migration: {backup_error}")
 
+        _begin_migration(cursor)
         if missing_analysis_status:
             cursor.execute("ALTER TABLE transcripts ADD COLUMN analysis_status TEXT")
         if missing_analysis_error:
@@ -228,21 +339,127 @@ def ensure_schema_migrations():
                 CREATE INDEX IF NOT EXISTS idx_transcript_checks_status ON transcript_checks(status)
             """)
 
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
         conn.commit()
     except Exception as e:
         print(f"[Config] Schema migration failed: {e}")
     finally:
-        conn.close()
+        _release_migration_conn(conn)
+
+# Secondary indexes for hot API/worker lookups; safe to re-run on every start
+INDEX_MIGRATIONS = [
+    "CREATE INDEX IF NOT EXISTS idx_analyses_transcript_created ON transcript_analyses(transcript_id, created_at DESC)",
+    # Prefix of idx_analyses_transcript_created, so it only costs writes
+    "DROP INDEX IF EXISTS idx_analyses_transcript",
+    # Older databases may hold case-duplicate group names, which would stop the unique
+    # index from building (and the API relies on it to reject duplicates). Keep the
+    # oldest group's name and suffix the others with their id.
+    """
+    UPDATE groups SET name = name || ' (' || id || ')'
+    WHERE EXISTS (
+        SELECT 1 FROM groups older
+        WHERE LOWER(older.name) = LOWER(groups.name) AND older.id < groups.id
+    )
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_groups_name_nocase ON groups(LOWER(name))",
+    # The PK leads with group_id; stock-side lookups (stock deletes cascading
+    # here, orphan cleanup, the active-group checks) need their own index.
+    # Carrying group_id makes it covering for the join to groups.
+    "CREATE INDEX IF NOT EXISTS idx_group_stocks_stock_group ON group_stocks(stock_id, group_id)",
+    "DROP INDEX IF EXISTS idx_group_stocks_stock",
+]
+
+def _index_names(cursor):
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+    return {row[0] for row in cursor.fetchall()}
+
+def ensure_index_migrations():
+    """Create missing secondary indexes on existing user databases."""
+    if not _DB_PRESENT:
+        return
+
+    conn = _open_migration_conn()
+    cursor = conn.cursor()
+    try:
+        indexes_before = _index_names(cursor)
+        _begin_migration(cursor)
+        for statement in INDEX_MIGRATIONS:
+            try:
+                cursor.execute(statement)
+            except (sqlite3.OperationalError, sqlite3.IntegrityError) as e:
+                print(f"[Config] Index migration skipped: {e}")
+        conn.commit()
+
+        # Refresh planner statistics only when the index set changed (or was
+        # never analyzed), so normal startups don't pay for a full ANALYZE
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+        if cursor.fetchone() is None or _index_names(cursor) != indexes_before:
+            cursor.execute("ANALYZE")
+    finally:
+        _release_migration_conn(conn)
+
+# Full-text index over stock names for the search box. External-content table,
+# kept in sync with `stocks` by triggers.
+STOCK_SEARCH_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS stocks_fts_insert AFTER INSERT ON stocks BEGIN
+        INSERT INTO stocks_fts(rowid, stock_name) VALUES (new.id, new.stock_name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS stocks_fts_delete AFTER DELETE ON stocks BEGIN
+        INSERT INTO stocks_fts(stocks_fts, rowid, stock_name) VALUES ('delete', old.id, old.stock_name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS stocks_fts_update AFTER UPDATE OF stock_name ON stocks BEGIN
+        INSERT INTO stocks_fts(stocks_fts, rowid, stock_name) VALUES ('delete', old.id, old.stock_name);
+        INSERT INTO stocks_fts(rowid, stock_name) VALUES (new.id, new.stock_name);
+    END""",
+]
+
+def ensure_search_index():
+    """Create the stocks_fts table (if FTS5 is available) and backfill it once."""
+    if not _DB_PRESENT:
+        return
+
+    conn = _open_migration_conn()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'stocks_fts'")
+        exists = cursor.fetchone() is not None
+        _begin_migration(cursor)
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS stocks_fts "
+            "USING fts5(stock_name, content='stocks', content_rowid='id')"
+        )
+        if not exists:
+            cursor.execute("INSERT INTO stocks_fts(stocks_fts) VALUES ('rebuild')")
+        for statement in STOCK_SEARCH_TRIGGERS:
+            cursor.execute(statement)
+        conn.commit()
+    except sqlite3.OperationalError as e:
+        # Python builds without FTS5 fall back to LIKE search in the API
+        conn.rollback()
+        print(f"[Config] Stock search index skipped: {e}")
+    finally:
+        _release_migration_conn(conn)
+
+def _data_version(cursor) -> int:
+    try:
+        cursor.execute("SELECT value FROM meta WHERE key = 'data_version'")
+    except sqlite3.OperationalError:
+        return 0  # meta table not created yet
+    row = cursor.fetchone()
+    return int(row[0]) if row else 0
 
 def ensure_data_migrations():
     """Apply data fixes for existing user databases."""
-    if not DATABASE_PATH.exists():
+    if not _DB_PRESENT:
         return
 
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.execute("PRAGMA foreign_keys = ON")
+    conn = _open_migration_conn()
     cursor = conn.cursor()
     try:
+        if _data_version(cursor) >= DATA_VERSION:
+            return
+
+        _begin_migration(cursor)
         # Data fix: Correct ISIN for stocks where Tijori API uses a different ISIN
         # These are known mismatches between our bundled data and Tijori's database
         isin_corrections = [
@@ -250,16 +467,16 @@ def ensure_data_migrations():
             ('KOTAKBANK', 'INE237A01028', 'INE237A01036'),
         ]
         
-        for symbol, wrong_isin, correct_isin in isin_corrections:
-            cursor.execute("""
-                UPDATE stocks 
-                SET isin_number = ? 
-                WHERE stock_symbol = ? AND isin_number = ?
-            """, (correct_isin, symbol, wrong_isin))
-            if cursor.rowcount > 0:
-                print(f"[Config] Fixed ISIN for {symbol}: {wrong_isin} -> {correct_isin}")
+        cursor.executemany("""
+            UPDATE stocks 
+            SET isin_number = ? 
+            WHERE stock_symbol = ? AND isin_number = ?
+        """, [(correct_isin, symbol, wrong_isin) for symbol, wrong_isin, correct_isin in isin_corrections])
+        if cursor.rowcount > 0:
+            print(f"[Config] Fixed ISIN for {cursor.rowcount} stock(s)")
         
-        # Cleanup orphaned rows (idempotent)
+        # Cleanup orphaned rows (idempotent). Each NOT IN subquery is run once and
+        # probed by rowid, so these are single passes, not correlated scans.
         cursor.execute("""
             DELETE FROM group_stocks
             WHERE group_id NOT IN (SELECT id FROM groups)
@@ -283,37 +500,101 @@ def ensure_data_migrations():
         """)
 
         # Reconcile: if a transcript is available for a quarter, mark upcoming rows as available.
+        # UPDATE ... FROM aggregates the available rows once instead of running two
+        # correlated subqueries per upcoming row (MAX skips NULL urls, like the old LIMIT 1).
         cursor.execute("""
             UPDATE transcripts
             SET status = 'available',
-                source_url = COALESCE(
-                    source_url,
-                    (SELECT t2.source_url FROM transcripts t2
-                     WHERE t2.stock_id = transcripts.stock_id
-                       AND t2.quarter = transcripts.quarter
-                       AND t2.year = transcripts.year
-                       AND t2.status = 'available'
-                       AND t2.source_url IS NOT NULL
-                     LIMIT 1)
-                ),
+                source_url = COALESCE(transcripts.source_url, available.source_url),
                 updated_at = CURRENT_TIMESTAMP
-            WHERE status = 'upcoming'
-              AND EXISTS (
-                  SELECT 1 FROM transcripts t2
-                  WHERE t2.stock_id = transcripts.stock_id
-                    AND t2.quarter = transcripts.quarter
-                    AND t2.year = transcripts.year
-                    AND t2.status = 'available'
-              )
+            FROM (
+                SELECT stock_id, quarter, year, MAX(source_url) AS source_url
+                FROM transcripts
+                WHERE status = 'available'
+                GROUP BY stock_id, quarter, year
+            ) AS available
+            WHERE transcripts.status = 'upcoming'
+              AND transcripts.stock_id = available.stock_id
+              AND transcripts.quarter = available.quarter
+              AND transcripts.year = available.year
         """)
 
+        cursor.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        cursor.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('data_version', ?)",
+            (str(DATA_VERSION),)
+        )
         conn.commit()
     except Exception as e:
         print(f"[Config] Data migration failed: {e}")
     finally:
-        conn.close()
+        _release_migration_conn(conn)
+
+def reset_interrupted_analyses():
+    """Release analysis claims left behind by jobs that died with the previous process.
+
+    Jobs run on daemon threads, so none survives a restart; an 'in_progress' row
+    seen at startup would otherwise block every later non-forced analysis.
+    """
+    if not _DB_PRESENT:
+        return
+
+    conn = _open_migration_conn()
+    try:
+        conn.execute("""
+            UPDATE transcripts
+            SET analysis_status = 'error', analysis_error = 'Interrupted by a restart'
+            WHERE analysis_status = 'in_progress'
+        """)
+    except sqlite3.OperationalError as e:
+        print(f"[Config] Resetting interrupted analyses failed: {e}")
+    finally:
+        _release_migration_conn(conn)
+
+_migrations_done = threading.Event()
+_post_migration_hooks: list = []
+_post_migration_lock = threading.Lock()
+
+def _run_migrations():
+    try:
+        ensure_schema_migrations()
+        ensure_index_migrations()
+        ensure_search_index()
+        ensure_data_migrations()
+        reset_interrupted_analyses()
+    finally:
+        try:
+            _close_migration_conn()
+        finally:
+            # Hooks run before the event is set, so waiters see their tables too
+            with _post_migration_lock:
+                for hook in _post_migration_hooks:
+                    try:
+                        hook()
+                    except Exception as e:
+                        print(f"[Config] Post-migration step failed: {e}")
+                _post_migration_hooks.clear()
+                _migrations_done.set()
+
+def run_after_migrations(hook):
+    """Run hook on the migration thread once migrations finish (now, if they already have).
+
+    For import-time DB setup (service tables and the like), which would otherwise
+    race the migrations' write transactions.
+    """
+    with _post_migration_lock:
+        if not _migrations_done.is_set():
+            _post_migration_hooks.append(hook)
+            return
+    hook()
+
+def wait_for_migrations(timeout: float = 30) -> bool:
+    """Block until the startup migrations have finished (True) or the timeout passes."""
+    return _migrations_done.wait(timeout)
 
-# Initialize on import
+# Initialize on import. The database file has to exist before anything connects,
+# but the migrations run in the background so importing config (and app start)
+# isn't held up by them; DB users call wait_for_migrations() first, and import-time
+# setup goes through run_after_migrations().
 initialize_user_data()
-ensure_schema_migrations()
-ensure_data_migrations()
+threading.Thread(target=_run_migrations, name='db-migrations', daemon=True).start()
@@ -1,14 +1,214 @@
+import atexit
+import os
+import queue
 import sqlite3
-from typing import Union
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Union
 from pathlib import Path
 
-from config import DATABASE_PATH
+from config import DATABASE_PATH_STR, SQLITE_MMAP_SIZE
 
 DBPath = Union[str, Path]
 
 
-def get_db_connection(db_path: DBPath = DATABASE_PATH) -> sqlite3.Connection:
-    conn = sqlite3.connect(str(db_path))
+# Per-connection tuning, applied once when a connection is opened. WAL (set at
+# startup; it's stored in the file) + synchronous=NORMAL is durable and avoids an
+# fsync per commit. Each value can be overridden from the environment.
+SQLITE_PRAGMAS = (
+    ("synchronous", os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")),
+    ("temp_store", os.environ.get("SQLITE_TEMP_STORE", "MEMORY")),
+    ("cache_size", os.environ.get("SQLITE_CACHE_SIZE", "-64000")),  # KiB when negative
+    ("mmap_size", os.environ.get("SQLITE_MMAP_SIZE", str(SQLITE_MMAP_SIZE))),
+    ("wal_autocheckpoint", os.environ.get("SQLITE_WAL_AUTOCHECKPOINT", "1000")),
+    ("busy_timeout", os.environ.get("SQLITE_BUSY_TIMEOUT", "5000")),
+)
+
+# Most connections a shared get_db_connection pool hands out at once; callers past
+# that wait (up to the pool timeout) for one to come back
+SHARED_POOL_SIZE = int(os.environ.get("SQLITE_POOL_SIZE", "64"))
+
+
+def _open_connection(
+    db_path: DBPath,
+    check_same_thread: bool = True,
+    cached_statements: int = 128,
+    factory: type = sqlite3.Connection,
+) -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        str(db_path),
+        check_same_thread=check_same_thread,
+        cached_statements=cached_statements,
+        factory=factory,
+    )
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON")
+    for name, value in SQLITE_PRAGMAS:
+        conn.execute(f"PRAGMA {name} = {value}")
     return conn
+
+
+class _PooledConnection(sqlite3.Connection):
+    """Connection whose close() hands it back to the pool it came from."""
+
+    _pool = None
+    _checked_out = False
+
+    def close(self):
+        # A second close() (or one on an idle connection) is a no-op, so the
+        # same connection can never end up in the pool twice
+        if self._checked_out:
+            self._pool.put(self)
+
+
+# SQLite allows one writer at a time. Writers in this process queue on this lock
+# instead of polling in SQLite's busy handler (which can time out under load).
+_write_lock = threading.Lock()
+
+
+@contextmanager
+def write_transaction(conn: sqlite3.Connection):
+    """
+    BEGIN IMMEDIATE ... COMMIT, serialized with the other writers in this process.
+    Rolls back if the block raises.
+    """
+    with _write_lock:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+
+class ConnectionPool:
+    """
+    Bounded LIFO pool of SQLite connections shared across threads.
+    LIFO keeps the most recently used (warmest) connections in rotation.
+    A checked-out connection goes back on put() or on its own close().
+    """
+
+    def __init__(
+        self,
+        db_path: DBPath = DATABASE_PATH_STR,
+        min_size: int = 2,
+        max_size: int = 10,
+        setup: Optional[Callable[[sqlite3.Connection], None]] = None,
+        timeout: float = 30.0,
+        cached_statements: int = 128,
+    ):
+        self.db_path = db_path
+        self.setup = setup
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._idle: "queue.LifoQueue[_PooledConnection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        for _ in range(min_size):
+            self._idle.put(self._connect())
+        with _pools_lock:
+            _pools.append(self)
+
+    def _connect(self) -> _PooledConnection:
+        conn = _open_connection(
+            self.db_path,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            factory=_PooledConnection,
+        )
+        conn._pool = self
+        if self.setup:
+            self.setup(conn)
+        return conn
+
+    def get(self) -> sqlite3.Connection:
+        """Check out a connection, opening one if none are idle and the pool isn't full."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError("Timed out waiting for a database connection")
+        try:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    conn = self._connect()
+                    break
+                try:
+                    conn.execute("SELECT 1")
+                    break
+                except sqlite3.Error:
+                    sqlite3.Connection.close(conn)
+        except Exception:
+            self._slots.release()
+            raise
+        conn._checked_out = True
+        return conn
+
+    def put(self, conn: sqlite3.Connection):
+        """Return a connection, discarding any uncommitted work and per-use settings."""
+        if not conn._checked_out:
+            return
+        conn._checked_out = False
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+            conn.isolation_level = ""  # callers may switch to autocommit
+            self._idle.put(conn)
+        except sqlite3.Error:
+            sqlite3.Connection.close(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def acquire(self):
+        conn = self.get()
+        try:
+            yield conn
+        finally:
+            self.put(conn)
+
+    def close_idle(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            sqlite3.Connection.close(conn)
+
+
+_pools: List[ConnectionPool] = []
+_pools_lock = threading.Lock()
+# get_db_connection's pools, one per (path, statement cache size)
+_shared_pools: Dict[tuple, ConnectionPool] = {}
+
+
+@atexit.register
+def _close_idle_connections():
+    with _pools_lock:
+        pools = list(_pools)
+    for pool in pools:
+        pool.close_idle()
+
+
+def get_db_connection(
+    db_path: DBPath = DATABASE_PATH_STR,
+    check_same_thread: bool = True,
+    cached_statements: int = 128,
+) -> sqlite3.Connection:
+    """
+    Connection from the process-wide pool for this database; close() returns it.
+    Pooled connections move between threads, so they are always opened with
+    check_same_thread=False (the flag is kept for call compatibility).
+    """
+    key = (str(db_path), cached_statements)
+    pool = _shared_pools.get(key)
+    if pool is None:
+        pool = ConnectionPool(
+            db_path,
+            min_size=0,
+            max_size=SHARED_POOL_SIZE,
+            cached_statements=cached_statements,
+        )
+        with _pools_lock:
+            pool = _shared_pools.setdefault(key, pool)
+    return pool.get()
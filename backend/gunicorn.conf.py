@@ -0,0 +1,13 @@
+# Production server config: gunicorn -c gunicorn.conf.py app:app
+# (the packaged desktop build keeps using app.run)
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:5001")
+# One process on purpose: the background scheduler, its poll lock/status and the
+# async PDF job map all live in app.py's process, so a second worker would poll
+# alongside it and report state it never sees. Concurrency comes from threads
+# (request handling is I/O-bound; CPU-heavy PDF renders run in their own pool).
+workers = 1
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 32))
+timeout = 120
@@ -1,19 +1,107 @@
+import atexit
+import logging
+import logging.handlers
 import threading
 import time
+import queue
 import sqlite3
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Optional
 
-# Add parent directory to path
 from config import DATABASE_PATH
-from db import get_db_connection
+from db import get_db_connection, write_transaction
 from services.prompt_service import PromptService
 from services.transcript_service import TranscriptService
 from services.llm.llm_service import LLMService
 from services.email_service import EmailService
 
+# Jobs are network-bound (transcript download + LLM), so a few run side by side.
+# Bounded so a big poll can't open more LLM calls than the provider allows.
+# Default matches ThreadPoolExecutor's sizing for I/O-bound work.
+ANALYSIS_WORKERS = max(1, int(os.environ.get("ANALYSIS_WORKERS", min(32, (os.cpu_count() or 1) + 4))))
+
+# Resolves prompts while the job's PDF downloads; the lookup is one short query
+_prompt_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="analysis-prompt")
+
+# Worker threads hand log records to a queue; a listener thread does the console
+# writes, so jobs never wait on stdout. Output stays the same bare lines print gave.
+# Messages use %-style args, so nothing is formatted for records the level drops
+# (ANALYSIS_LOG_LEVEL=WARNING silences the per-step progress lines).
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    _log_queue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+    logger.setLevel(os.environ.get("ANALYSIS_LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+    _log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler(sys.stdout))
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+
+# Hot-path SQL lives here so every job sends byte-identical text and hits the
+# pooled connection's statement cache instead of re-preparing.
+# Stock row plus both eligibility flags in one round-trip
+SQL_LOAD_STOCK = """
+    SELECT s.id, s.stock_symbol, s.bse_code,
+           EXISTS(SELECT 1 FROM watchlist_items w WHERE w.stock_id = s.id) AS in_watchlist,
+           EXISTS(
+               SELECT 1
+               FROM group_stocks gs
+               JOIN groups g ON g.id = gs.group_id
+               WHERE gs.stock_id = s.id AND g.is_active = 1
+           ) AS in_active_group
+    FROM stocks s
+    WHERE s.id = ?
+"""
+SQL_EMAIL_STOCK = """
+    SELECT s.stock_name,
+           EXISTS(SELECT 1 FROM watchlist_items w WHERE w.stock_id = s.id) AS in_watchlist
+    FROM stocks s
+    WHERE s.id = ?
+"""
+# Atomic claim: flips the transcript to in_progress only if no other job holds it
+# (force overrides). Claims orphaned by a restart are cleared at startup
+# (config.reset_interrupted_analyses).
+SQL_CLAIM_TRANSCRIPT = """
+    UPDATE transcripts
+    SET analysis_status = 'in_progress', analysis_error = NULL
+    WHERE id = ? AND (? OR analysis_status IS NOT 'in_progress')
+    RETURNING id
+"""
+SQL_SET_ANALYSIS_STATUS = """
+    UPDATE transcripts
+    SET analysis_status = ?, analysis_error = ?
+    WHERE id = ?
+"""
+# The transcript and whether it already has an analysis, in one read. With
+# UNIQUE(stock_id, quarter, year) this also answers "analysis exists for the quarter".
+SQL_LOAD_TRANSCRIPT = """
+    SELECT t.id, t.quarter, t.year, t.source_url, t.status,
+           EXISTS(SELECT 1 FROM transcript_analyses ta WHERE ta.transcript_id = t.id) AS has_analysis
+    FROM transcripts t
+    WHERE t.stock_id = ? AND t.quarter = ? AND t.year = ?
+"""
+# Upsert so a row stored concurrently by the scheduler is reused instead of
+# failing the job on UNIQUE(stock_id, quarter, year)
+SQL_INSERT_TRANSCRIPT = """
+    INSERT INTO transcripts (stock_id, quarter, year, source_url, status, content_path)
+    VALUES (?, ?, ?, ?, 'available', ?)
+    ON CONFLICT(stock_id, quarter, year) DO UPDATE SET
+        source_url = excluded.source_url,
+        status = 'available'
+    RETURNING id
+"""
+SQL_UPDATE_TRANSCRIPT_URL = "UPDATE transcripts SET source_url = ?, status = 'available' WHERE id = ?"
+SQL_MARK_TRANSCRIPT_AVAILABLE = "UPDATE transcripts SET status = 'available' WHERE id = ? AND status != 'available'"
+SQL_INSERT_ANALYSIS = """
+    INSERT INTO transcript_analyses (transcript_id, prompt_snapshot, llm_output, model_provider)
+    VALUES (?, ?, ?, ?)
+"""
+SQL_DELETE_ANALYSES = "DELETE FROM transcript_analyses WHERE transcript_id = ?"
+
+
 class AnalysisWorker:
     def __init__(self):
         self.prompt_service = PromptService()
@@ -21,51 +109,46 @@ class AnalysisWorker:
         self.llm_service = LLMService()
         self.email_service = EmailService()
         self.db_path = str(DATABASE_PATH)
+        self._jobs = queue.Queue()
+        self._workers = []
+        self._workers_lock = threading.Lock()
 
     def get_db_connection(self):
         return get_db_connection(self.db_path)
 
-    def _analysis_exists_for_quarter(self, cursor, stock_id: int, quarter: str, year: int) -> bool:
-        cursor.execute("""
-            SELECT 1
-            FROM transcript_analyses ta
-            JOIN transcripts t ON t.id = ta.transcript_id
-            WHERE t.stock_id = ? AND t.quarter = ? AND t.year = ?
-            LIMIT 1
-        """, (stock_id, quarter, year))
-        return cursor.fetchone() is not None
-
-    def _is_in_active_group(self, cursor, stock_id: int) -> bool:
-        cursor.execute("""
-            SELECT 1
-            FROM group_stocks gs
-            JOIN groups g ON g.id = gs.group_id
-            WHERE gs.stock_id = ? AND g.is_active = 1
-            LIMIT 1
-        """, (stock_id,))
-        return cursor.fetchone() is not None
-
     def _set_analysis_status(self, cursor, transcript_id: int, status: str, error: Optional[str] = None):
-        cursor.execute("""
-            UPDATE transcripts
-            SET analysis_status = ?, analysis_error = ?
-            WHERE id = ?
-        """, (status, error, transcript_id))
+        cursor.execute(SQL_SET_ANALYSIS_STATUS, (status, error, transcript_id))
+
+    def _ensure_workers(self):
+        # Started on first use so constructing the worker doesn't spawn threads
+        with self._workers_lock:
+            if self._workers:
+                return
+            for i in range(ANALYSIS_WORKERS):
+                thread = threading.Thread(target=self._run, name=f"analysis-worker-{i}")
+                thread.daemon = True # Daemon threads so they don't block app exit
+                thread.start()
+                self._workers.append(thread)
+
+    def _run(self):
+        while True:
+            args = self._jobs.get()
+            try:
+                self._process_analysis_job(*args)
+            except Exception as e:
+                logger.error("[AnalysisWorker] Unhandled error in job %s: %s", args[1], e)
+            finally:
+                self._jobs.task_done()
 
     def start_analysis_job(self, stock_id: int, quarter: Optional[str] = None, year: Optional[int] = None, force: bool = False) -> str:
         """
-        Starts the analysis job in a background thread.
+        Queues the analysis job for the background worker threads.
         Returns a Job ID (for now, we'll just return a timestamp-based ID).
         """
         job_id = f"job_{stock_id}_{int(time.time())}"
         
-        # Start background thread
-        thread = threading.Thread(
-            target=self._process_analysis_job,
-            args=(stock_id, job_id, quarter, year, force)
-        )
-        thread.daemon = True # Daemon thread so it doesn't block app exit
-        thread.start()
+        self._ensure_workers()
+        self._jobs.put((stock_id, job_id, quarter, year, force))
         
         return job_id
 
@@ -73,177 +156,209 @@ class AnalysisWorker:
         """
         Internal method running in background thread.
         """
-        print(f"[{job_id}] Starting analysis for stock {stock_id}")
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
+        logger.info("[%s] Starting analysis for stock %s", job_id, stock_id)
+        conn = cursor = None
+
+        # The job works in three phases: claim (DB), download + LLM (no DB, can take
+        # minutes), persist (DB). The pooled connection is handed back between them
+        # so a slow job doesn't pin it.
+        def acquire_db():
+            nonlocal conn, cursor
+            if conn is None:
+                conn = self.get_db_connection()
+                # Autocommit: every write group goes through write_transaction, which
+                # opens its own BEGIN IMMEDIATE (the pool restores the default on close)
+                conn.isolation_level = None
+                cursor = conn.cursor()
+
+        def release_db():
+            nonlocal conn, cursor
+            if conn is not None:
+                conn.close()
+                conn = cursor = None
+
+        transcript_id = None
+        analysis_started = False
+        analysis_completed = False
+        acquire_db()
         
-        try:
-            # 1. Get Stock Symbol
-            cursor.execute("SELECT stock_symbol, bse_code FROM stocks WHERE id = ?", (stock_id,))
-            stock = cursor.fetchone()
+        def stock_eligible(stock) -> bool:
+            """Only analyze stocks that are currently in the watchlist and not in an active group."""
             if not stock:
-                print(f"[{job_id}] Stock not found!")
-                return
+                logger.warning("[%s] Stock not found!", job_id)
+                return False
 
-            # Only analyze stocks that are currently in the watchlist
-            cursor.execute("SELECT 1 FROM watchlist_items WHERE stock_id = ? LIMIT 1", (stock_id,))
-            if cursor.fetchone() is None:
-                print(f"[{job_id}] Stock {stock_id} not in watchlist; skipping analysis job.")
-                return
+            if not stock['in_watchlist']:
+                logger.info("[%s] Stock %s not in watchlist; skipping analysis job.", job_id, stock_id)
+                return False
+
+            if stock['in_active_group']:
+                logger.info("[%s] Stock %s is in an active group; skipping analysis job.", job_id, stock_id)
+                return False
+            return True
 
-            if self._is_in_active_group(cursor, stock_id):
-                print(f"[{job_id}] Stock {stock_id} is in an active group; skipping analysis job.")
+        try:
+            # 1. Get Stock Symbol
+            cursor.execute(SQL_LOAD_STOCK, (stock_id,))
+            stock = cursor.fetchone()
+            if not stock_eligible(stock):
                 return
             
             symbol = stock['stock_symbol'] or stock['bse_code']
             if not symbol:
-                print(f"[{job_id}] No symbol/bse_code found for stock {stock_id}")
+                logger.warning("[%s] No symbol/bse_code found for stock %s", job_id, stock_id)
                 return
-            print(f"[{job_id}] Processing symbol: {symbol}")
+            logger.info("[%s] Processing symbol: %s", job_id, symbol)
 
             # 2. Resolve which transcript to analyze
-            transcript_id = None
             transcript_text = ""
             target_quarter = quarter
             target_year = year
             transcript_source_url = None
-            analysis_started = False
-            analysis_completed = False
 
-            def mark_analysis_in_progress():
+            def mark_analysis_in_progress() -> bool:
+                """
+                Claims the transcript for this job; False if another job already has it.
+                Runs inside the caller's write_transaction.
+                """
                 nonlocal analysis_started
                 if transcript_id and not analysis_started:
-                    self._set_analysis_status(cursor, transcript_id, 'in_progress', None)
-                    conn.commit()
+                    # Membership can change while the job waits in the queue or fetches;
+                    # the claim's own transaction has the final say
+                    cursor.execute(SQL_LOAD_STOCK, (stock_id,))
+                    if not stock_eligible(cursor.fetchone()):
+                        return False
+                    cursor.execute(SQL_CLAIM_TRANSCRIPT, (transcript_id, force))
+                    claimed = bool(cursor.fetchall())
+                    if not claimed:
+                        logger.info("[%s] Transcript %s is already being analyzed; skipping.", job_id, transcript_id)
+                        return False
                     analysis_started = True
+                return True
+
+            prompt_future = None
+
+            def download_text(url: str) -> str:
+                """Downloads the transcript, resolving the prompt on the side meanwhile."""
+                nonlocal prompt_future
+                prompt_future = _prompt_pool.submit(self.prompt_service.resolve_prompt, stock_id)
+                return self.transcript_service.download_and_extract(url)
 
             if quarter and year:
-                print(f"[{job_id}] Using requested quarter/year: {quarter} {year}")
-                cursor.execute("""
-                    SELECT id, quarter, year, source_url, status 
-                    FROM transcripts 
-                    WHERE stock_id = ? AND quarter = ? AND year = ?
-                    LIMIT 1
-                """, (stock_id, quarter, year))
-                transcript_row = cursor.fetchone()
+                logger.info("[%s] Using requested quarter/year: %s %s", job_id, quarter, year)
+                # Validation and the claim share one transaction, so the transcript
+                # can't change state between being checked and being claimed
+                with write_transaction(conn):
+                    cursor.execute(SQL_LOAD_TRANSCRIPT, (stock_id, quarter, year))
+                    transcript_row = cursor.fetchone()
 
-                if not transcript_row:
-                    print(f"[{job_id}] Transcript not found for {symbol} {quarter} {year}")
-                    return
+                    if not transcript_row:
+                        logger.warning("[%s] Transcript not found for %s %s %s", job_id, symbol, quarter, year)
+                        return
 
-                if transcript_row['status'] != 'available':
-                    print(f"[{job_id}] Transcript not available (status={transcript_row['status']}) for {symbol} {quarter} {year}")
-                    return
+                    if transcript_row['status'] != 'available':
+                        logger.warning("[%s] Transcript not available (status=%s) for %s %s %s", job_id, transcript_row['status'], symbol, quarter, year)
+                        return
 
-                if not transcript_row['source_url']:
-                    print(f"[{job_id}] Transcript has no source_url for {symbol} {quarter} {year}")
-                    return
+                    if not transcript_row['source_url']:
+                        logger.warning("[%s] Transcript has no source_url for %s %s %s", job_id, symbol, quarter, year)
+                        return
 
-                if not force and self._analysis_exists_for_quarter(cursor, stock_id, transcript_row['quarter'], transcript_row['year']):
-                    print(f"[{job_id}] Analysis already exists for {symbol} {quarter} {year}, skipping to prevent duplicate email")
-                    return
+                    # Check if analysis already exists for this transcript (prevents duplicate emails)
+                    if transcript_row['has_analysis'] and not force:
+                        logger.info("[%s] Analysis already exists for %s %s %s, skipping to prevent duplicate email", job_id, symbol, quarter, year)
+                        return
 
-                transcript_id = transcript_row['id']
-                target_quarter = transcript_row['quarter']
-                target_year = transcript_row['year']
-                transcript_source_url = transcript_row['source_url']
-                
-                # Check if analysis already exists for this transcript (prevents duplicate emails)
-                cursor.execute("""
-                    SELECT id FROM transcript_analyses WHERE transcript_id = ?
-                """, (transcript_id,))
-                if cursor.fetchone() and not force:
-                    print(f"[{job_id}] Analysis already exists for {symbol} {quarter} {year}, skipping to prevent duplicate email")
-                    return
+                    transcript_id = transcript_row['id']
+                    target_quarter = transcript_row['quarter']
+                    target_year = transcript_row['year']
+                    transcript_source_url = transcript_row['source_url']
 
-                mark_analysis_in_progress()
-                print(f"[{job_id}] Downloading and extracting text...")
-                transcript_text = self.transcript_service.download_and_extract(transcript_row['source_url'])
+                    claimed = mark_analysis_in_progress()
+                if not claimed:
+                    return
+                release_db()
+                logger.info("[%s] Downloading and extracting text...", job_id)
+                transcript_text = download_text(transcript_row['source_url'])
 
             else:
                 # Fallback to latest transcript from provider
-                print(f"[{job_id}] Fetching transcripts for {symbol}...")
+                logger.info("[%s] Fetching transcripts for %s...", job_id, symbol)
+                release_db()
                 transcripts = self.transcript_service.fetch_available_transcripts(symbol)
+                acquire_db()
                 
                 if not transcripts:
-                    print(f"[{job_id}] No transcripts found for {symbol}")
+                    logger.info("[%s] No transcripts found for %s", job_id, symbol)
                     return
 
                 latest_transcript = transcripts[0]
                 target_quarter = latest_transcript.quarter
                 target_year = latest_transcript.year
                 transcript_source_url = latest_transcript.source_url
-                print(f"[{job_id}] Found transcript: {latest_transcript.title}")
-
-                if not force and self._analysis_exists_for_quarter(cursor, stock_id, target_quarter, target_year):
-                    print(f"[{job_id}] Analysis already exists for {symbol} {target_quarter} {target_year}, skipping to prevent duplicate email")
-                    return
+                logger.info("[%s] Found transcript: %s", job_id, latest_transcript.title)
 
                 # Check if we already have a transcript for this quarter/year combination
                 # OR the exact same source_url (to handle URL changes for same quarter)
-                cursor.execute("""
-                    SELECT id, source_url FROM transcripts 
-                    WHERE stock_id = ? AND quarter = ? AND year = ?
-                """, (stock_id, latest_transcript.quarter, latest_transcript.year))
+                cursor.execute(SQL_LOAD_TRANSCRIPT, (stock_id, latest_transcript.quarter, latest_transcript.year))
                 
                 transcript_row = cursor.fetchone()
+
+                if transcript_row and transcript_row['has_analysis'] and not force:
+                    logger.info("[%s] Analysis already exists for %s %s %s, skipping to prevent duplicate email", job_id, symbol, target_quarter, target_year)
+                    return
                 
                 if not transcript_row:
-                    print(f"[{job_id}] Downloading and extracting text...")
-                    transcript_text = self.transcript_service.download_and_extract(latest_transcript.source_url)
+                    logger.info("[%s] Downloading and extracting text...", job_id)
+                    release_db()
+                    transcript_text = download_text(latest_transcript.source_url)
+                    acquire_db()
                     
                     # Save to DB - set status to 'available' since we have a valid source_url
-                    cursor.execute("""
-                        INSERT INTO transcripts (stock_id, quarter, year, source_url, status, content_path)
-                        VALUES (?, ?, ?, ?, 'available', ?)
-                    """, (stock_id, latest_transcript.quarter, latest_transcript.year, latest_transcript.source_url, "placeholder_path"))
-                    conn.commit()
-                    transcript_id = cursor.lastrowid
-                    mark_analysis_in_progress()
+                    # Commits the insert together with the in_progress marker
+                    with write_transaction(conn):
+                        cursor.execute(SQL_INSERT_TRANSCRIPT, (stock_id, latest_transcript.quarter, latest_transcript.year, latest_transcript.source_url, "placeholder_path"))
+                        transcript_id = cursor.fetchone()['id']
+                        claimed = mark_analysis_in_progress()
+                    if not claimed:
+                        return
                 else:
-                    print(f"[{job_id}] Using existing transcript record.")
+                    logger.info("[%s] Using existing transcript record.", job_id)
                     transcript_id = transcript_row['id']
                     
-                    # Check if analysis already exists for this transcript (prevents duplicate emails)
-                    cursor.execute("""
-                        SELECT id FROM transcript_analyses WHERE transcript_id = ?
-                    """, (transcript_id,))
-                    if cursor.fetchone() and not force:
-                        print(f"[{job_id}] Analysis already exists for {symbol} {latest_transcript.quarter} {latest_transcript.year}, skipping to prevent duplicate email")
-                        return
-                    
-                    mark_analysis_in_progress()
                     # Update source_url if it changed (API might return new URL for same quarter)
                     # Also ensure status is 'available' since we have a valid transcript URL
-                    if transcript_row['source_url'] != latest_transcript.source_url:
-                        print(f"[{job_id}] Updating transcript URL and status (changed from API)...")
-                        cursor.execute("""
-                        UPDATE transcripts SET source_url = ?, status = 'available' WHERE id = ?
-                    """, (latest_transcript.source_url, transcript_id))
-                    else:
-                        # Even if URL didn't change, ensure status is 'available' (fixes edge case where
-                        # transcript was marked 'upcoming' but now has a valid source_url)
-                        cursor.execute("""
-                        UPDATE transcripts SET status = 'available' WHERE id = ? AND status != 'available'
-                    """, (transcript_id,))
-                    conn.commit()
+                    # One commit for the URL/status fix and the in_progress marker
+                    with write_transaction(conn):
+                        if transcript_row['source_url'] != latest_transcript.source_url:
+                            logger.info("[%s] Updating transcript URL and status (changed from API)...", job_id)
+                            cursor.execute(SQL_UPDATE_TRANSCRIPT_URL, (latest_transcript.source_url, transcript_id))
+                        else:
+                            # Even if URL didn't change, ensure status is 'available' (fixes edge case where
+                            # transcript was marked 'upcoming' but now has a valid source_url)
+                            cursor.execute(SQL_MARK_TRANSCRIPT_AVAILABLE, (transcript_id,))
+                        claimed = mark_analysis_in_progress()
+                    if not claimed:
+                        return
                     transcript_source_url = latest_transcript.source_url
                     
                     # Re-download text for analysis
-                    print(f"[{job_id}] Downloading text for analysis...")
-                    transcript_text = self.transcript_service.download_and_extract(latest_transcript.source_url)
+                    release_db()
+                    logger.info("[%s] Downloading text for analysis...", job_id)
+                    transcript_text = download_text(latest_transcript.source_url)
 
             # 3. Resolve Prompt
-            print(f"[{job_id}] Resolving prompt...")
-            system_prompt = self.prompt_service.resolve_prompt(stock_id)
-            print(f"[{job_id}] Prompt resolved: {system_prompt[:50]}...")
+            logger.info("[%s] Resolving prompt...", job_id)
+            system_prompt = prompt_future.result()
+            logger.info("[%s] Prompt resolved: %.50s...", job_id, system_prompt)
 
             # 4. Call LLM
-            print(f"[{job_id}] Calling LLM...")
+            logger.info("[%s] Calling LLM...", job_id)
             
             try:
                 llm_response = self.llm_service.generate(
-                    prompt=f"Here is the transcript text:\n\n{transcript_text}",
+                    # Header and transcript go as separate pieces (no combined copy)
+                    prompt=("Here is the transcript text:\n\n", transcript_text),
                     system_prompt=system_prompt,
                     thinking_mode=True,  # Default to thinking mode for analysis
                     max_tokens=12000,    # Request longer analyses by default
@@ -253,40 +368,38 @@ class AnalysisWorker:
                 provider_name = llm_response.provider_name
                 
             except Exception as e:
-                print(f"[{job_id}] LLM generation failed: {e}")
+                logger.error("[%s] LLM generation failed: %s", job_id, e)
                 raise e
 
             # 5. Save Results
-            print(f"[{job_id}] Saving results...")
-            cursor.execute("""
-                INSERT INTO transcript_analyses (transcript_id, prompt_snapshot, llm_output, model_provider)
-                VALUES (?, ?, ?, ?)
-            """, (transcript_id, system_prompt, llm_output, provider_name))
-            conn.commit()
-            new_analysis_id = cursor.lastrowid
-            if transcript_id:
-                self._set_analysis_status(cursor, transcript_id, 'done', None)
-                conn.commit()
-                analysis_completed = True
-
-            if force:
-                cursor.execute("""
-                    DELETE FROM transcript_analyses
-                    WHERE transcript_id = ? AND id != ?
-                """, (transcript_id, new_analysis_id))
-                conn.commit()
+            # Force cleanup, insert and 'done' status go out as one transaction,
+            # so the job's terminal state costs a single commit (one WAL fsync).
+            # SQLite has no DML in CTEs; deleting the old analyses first instead of
+            # "all but the new id" afterwards needs no rowid round-trip and lets the
+            # insert reuse the pages the delete just freed.
+            logger.info("[%s] Saving results...", job_id)
+            acquire_db()
+            with write_transaction(conn):
+                if force:
+                    cursor.execute(SQL_DELETE_ANALYSES, (transcript_id,))
+                cursor.execute(SQL_INSERT_ANALYSIS, (transcript_id, system_prompt, llm_output, provider_name))
+                if transcript_id:
+                    self._set_analysis_status(cursor, transcript_id, 'done', None)
+            analysis_completed = bool(transcript_id)
             
             # 6. Send Email
-            print(f"[{job_id}] Sending emails...")
+            logger.info("[%s] Sending emails...", job_id)
             email_list = self.email_service.get_active_email_list()
             if email_list:
-                cursor.execute("SELECT 1 FROM watchlist_items WHERE stock_id = ? LIMIT 1", (stock_id,))
-                if cursor.fetchone() is None:
-                    print(f"[{job_id}] Stock {stock_id} not in watchlist; skipping analysis emails.")
+                # Re-check the watchlist (it may have changed during the LLM call)
+                # and get the stock name in one query
+                cursor.execute(SQL_EMAIL_STOCK, (stock_id,))
+                email_stock = cursor.fetchone()
+                if email_stock is None or not email_stock['in_watchlist']:
+                    logger.info("[%s] Stock %s not in watchlist; skipping analysis emails.", job_id, stock_id)
                 else:
-                    # Get stock name
-                    cursor.execute("SELECT stock_name FROM stocks WHERE id = ?", (stock_id,))
-                    stock_name = cursor.fetchone()['stock_name']
+                    stock_name = email_stock['stock_name']
+                    release_db()
                     
                     # Get model name from LLM response
                     model_name = llm_response.model_id if hasattr(llm_response, 'model_id') else provider_name
@@ -304,27 +417,42 @@ class AnalysisWorker:
                                 model_name=model_name,
                                 transcript_url=transcript_source_url
                             )
-                            print(f"[{job_id}] Email sent to {email}")
+                            logger.info("[%s] Email sent to %s", job_id, email)
                         except Exception as e:
-                            print(f"[{job_id}] Failed to send email to {email}: {e}")
+                            logger.error("[%s] Failed to send email to %s: %s", job_id, email, e)
             else:
-                print(f"[{job_id}] No active email recipients found.")
-            conn.commit()
+                logger.info("[%s] No active email recipients found.", job_id)
             
-            print(f"[{job_id}] Job complete.")
+            logger.info("[%s] Job complete.", job_id)
 
         except Exception as e:
-            print(f"[{job_id}] Job failed: {e}")
-            if transcript_id and not analysis_completed:
+            logger.exception("[%s] Job failed: %s", job_id, e)
+            # Only the job holding the claim may overwrite the status
+            if transcript_id and analysis_started and not analysis_completed:
                 try:
+                    # Drop whatever half-written batch we were in, then record the error
+                    if conn is not None and conn.in_transaction:
+                        conn.rollback()
+                    acquire_db()
                     error_message = str(e)
                     if len(error_message) > 500:
                         error_message = error_message[:500]
-                    self._set_analysis_status(cursor, transcript_id, 'error', error_message)
-                    conn.commit()
+                    with write_transaction(conn):
+                        self._set_analysis_status(cursor, transcript_id, 'error', error_message)
                 except Exception as status_error:
-                    print(f"[{job_id}] Failed to record analysis error: {status_error}")
-            import traceback
-            traceback.print_exc()
+                    logger.error("[%s] Failed to record analysis error: %s", job_id, status_error)
         finally:
-            conn.close()
+            release_db()
+
+
+# Singleton instance, so the API and the scheduler share one job queue and worker pool
+_analysis_worker = None
+_analysis_worker_lock = threading.Lock()
+
+def get_analysis_worker() -> AnalysisWorker:
+    """Get or create the analysis worker singleton."""
+    global _analysis_worker
+    with _analysis_worker_lock:
+        if _analysis_worker is None:
+            _analysis_worker = AnalysisWorker()
+        return _analysis_worker
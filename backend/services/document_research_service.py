@@ -4,25 +4,29 @@ Document Research Service - Handles annual report fetching and LLM analysis.
 import threading
 import sqlite3
 import os
-import sys
 import html
 import json
 import re
 import io
 import requests
 import random
+import time
 from datetime import datetime
 from typing import List, Dict, Optional
 import markdown
 from bs4 import BeautifulSoup
 from io import BytesIO
 
-# Add parent directory to path
-from config import DATABASE_PATH
+from config import DATABASE_PATH, PDF_CACHE_DIR, run_after_migrations
 from db import get_db_connection
 from services.llm.llm_service import LLMService
 from services.email_service import EmailService
 
+# Rendered research PDFs are a cache: files unused for a week, or past the size cap
+# (oldest first), are removed whenever a new one is written
+PDF_CACHE_TTL_SECONDS = int(os.environ.get("PDF_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+PDF_CACHE_MAX_BYTES = int(os.environ.get("PDF_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+
 # PDF generation
 try:
     from xhtml2pdf import pisa
@@ -68,7 +72,7 @@ class DocumentResearchService:
         self.db_path = str(DATABASE_PATH)
         self.llm_service = LLMService()
         self.email_service = EmailService()
-        self.ensure_table()
+        run_after_migrations(self.ensure_table)
 
     def get_db_connection(self):
         return get_db_connection(self.db_path)
@@ -484,3 +488,63 @@ Years included: {', '.join(str(y) for y in sorted(document_years, reverse=True))
             return None
         
         return result.getvalue()
+
+    def generate_pdf_file(self, run_id: int) -> Optional[str]:
+        """Path to the run's PDF on disk, rendering it on first request.
+
+        Keyed by updated_at so a re-run gets a fresh file; serving from disk
+        lets the WSGI server sendfile() it instead of copying bytes through Python.
+        """
+        run = self.get_run(run_id)
+        if not run or run.get('status') != 'done':
+            return None
+
+        stamp = re.sub(r'\W', '', str(run.get('updated_at', '')))
+        path = PDF_CACHE_DIR / f"research_{run_id}_{stamp}.pdf"
+        if path.exists():
+            try:
+                os.utime(path)  # mtime doubles as last-used time for eviction
+            except OSError:
+                pass
+            return str(path)
+
+        pdf_content = self.generate_pdf(run_id)
+        if not pdf_content:
+            return None
+
+        PDF_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so a concurrent download never sees a partial file
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(pdf_content)
+        os.replace(tmp_path, path)
+        self._prune_pdf_cache(run_id, keep=path)
+        return str(path)
+
+    def _prune_pdf_cache(self, run_id: int, keep):
+        """Drops superseded renders of this run, expired files, then oldest files over the size cap."""
+        now = time.time()
+        entries = []
+        for entry in os.scandir(PDF_CACHE_DIR):
+            if entry.path == str(keep) or not entry.is_file():
+                continue
+            try:
+                stat = entry.stat()
+                if (
+                    entry.name.startswith(f"research_{run_id}_")
+                    or now - stat.st_mtime > PDF_CACHE_TTL_SECONDS
+                ):
+                    os.remove(entry.path)
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            except OSError:
+                pass  # vanished, or still open for a download (Windows)
+
+        total = sum(size for _, size, _ in entries) + os.path.getsize(keep)
+        for _, size, entry_path in sorted(entries):
+            if total <= PDF_CACHE_MAX_BYTES:
+                break
+            try:
+                os.remove(entry_path)
+                total -= size
+            except OSError:
+                pass
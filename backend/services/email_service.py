@@ -5,9 +5,14 @@ import sqlite3
 import os
 import sys
 import ssl
+import threading
 import html
+import time
+from contextlib import contextmanager
 from urllib.parse import urlsplit, urlunsplit, quote
 from typing import Optional, Dict, Any
+from functools import lru_cache
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 
 # Import certifi for SSL certificates in bundled apps
@@ -25,10 +30,51 @@ if VENDOR_PATH not in sys.path:
 
 import markdown
 
-# Add parent directory to path
 from config import DATABASE_PATH
 from db import get_db_connection
 
+# Idle, logged-in SMTP connections per (server, port, login), shared by every
+# EmailService instance so the TLS handshake + auth are paid once per connection
+# instead of once per email. smtplib connections aren't thread-safe, so each send
+# checks one out of the pool (opening a new one if none are idle) and returns it.
+# Entries are (connection, idle_since); servers drop idle sessions after a couple
+# of minutes, so anything idle longer than SMTP_IDLE_TTL is closed, not NOOP'd.
+SMTP_IDLE_TTL = 100  # seconds
+_SMTP_POOL: Dict[tuple, list] = {}
+_SMTP_POOL_LOCK = threading.Lock()
+MAIL_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix='mail')
+
+class SMTPSession:
+    """One pooled SMTP connection held for a batch of sends (see EmailService.smtp_session)."""
+
+    def __init__(self, service: 'EmailService', smtp_config: Dict[str, Any]):
+        self.service = service
+        self.config = smtp_config
+        self.server = service._checkout_smtp(smtp_config)
+
+    def send_message(self, msg: MIMEMultipart):
+        if self.server is None:
+            self.server = self.service._open_smtp(self.config)
+        # Retry once on a fresh connection if the server dropped this one; on any
+        # other failure the connection state is unknown, so reopen on next send
+        try:
+            try:
+                self.server.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                self.service._close_smtp(self.server)
+                self.server = self.service._open_smtp(self.config)
+                self.server.send_message(msg)
+        except Exception:
+            self.service._close_smtp(self.server)
+            self.server = None
+            raise
+
+    def close(self):
+        if self.server is not None:
+            self.service._checkin_smtp(self.config, self.server)
+            self.server = None
+
+
 class EmailService:
     def __init__(self):
         self.db_path = str(DATABASE_PATH)
@@ -84,10 +130,24 @@ class EmailService:
         except Exception as e:
             raise Exception(f'Connection error: {str(e)}')
 
-    def send_email(self, to_email: str, subject: str, body: str, is_html: bool = False) -> bool:
-        """Send email using active SMTP configuration"""
+    @contextmanager
+    def smtp_session(self, smtp_config: Optional[Dict[str, Any]] = None):
+        """Log in once and reuse the connection for every send_* call given session=..."""
+        if smtp_config is None:
+            smtp_config = self.get_active_smtp_config()
+            if not smtp_config:
+                raise ValueError("No active SMTP configuration found")
+        session = SMTPSession(self, smtp_config)
+        try:
+            yield session
+        finally:
+            session.close()
+
+    def send_email(self, to_email: str, subject: str, body: str, is_html: bool = False,
+                   session: Optional[SMTPSession] = None) -> bool:
+        """Send email using active SMTP configuration (or the given session's)"""
         # Get active SMTP config
-        smtp_config = self.get_active_smtp_config()
+        smtp_config = session.config if session else self.get_active_smtp_config()
         if not smtp_config:
             raise ValueError("No active SMTP configuration found")
         
@@ -101,17 +161,12 @@ class EmailService:
             # Add body
             msg.attach(MIMEText(body, 'html' if is_html else 'plain'))
             
-            # Send email with timeout and SSL context - use certifi for CA certs
-            server = smtplib.SMTP(smtp_config['smtp_server'], int(smtp_config['smtp_port']), timeout=30)
-            server.ehlo()
-            context = ssl.create_default_context()
-            if SSL_CERT_FILE:
-                context.load_verify_locations(SSL_CERT_FILE)
-            server.starttls(context=context)
-            server.ehlo()
-            server.login(smtp_config['email'], smtp_config['app_password'])
-            server.send_message(msg)
-            server.quit()
+            # Reuse the caller's session, or a pooled connection for this SMTP setting
+            if session is not None:
+                session.send_message(msg)
+            else:
+                with self.smtp_session(smtp_config) as single:
+                    single.send_message(msg)
             
             return True
             
@@ -120,6 +175,68 @@ class EmailService:
         except Exception as e:
             raise Exception(f"Failed to send email: {str(e)}")
 
+    def send_email_async(self, to_email: str, subject: str, body: str, is_html: bool = False) -> Future:
+        """Queue send_email on the mail executor; returns the Future."""
+        future = MAIL_EXECUTOR.submit(self.send_email, to_email, subject, body, is_html)
+
+        def log_failure(done: Future):
+            if done.exception():
+                print(f"[Email] Queued send to {to_email} failed: {done.exception()}")
+
+        future.add_done_callback(log_failure)
+        return future
+
+    @staticmethod
+    def _smtp_pool_key(smtp_config: Dict[str, Any]) -> tuple:
+        return (
+            smtp_config['smtp_server'],
+            int(smtp_config['smtp_port']),
+            smtp_config['email'],
+            smtp_config['app_password'],
+        )
+
+    def _checkout_smtp(self, smtp_config: Dict[str, Any]) -> smtplib.SMTP:
+        """Take a live idle connection for this setting from the pool, or open a new one."""
+        key = self._smtp_pool_key(smtp_config)
+        while True:
+            with _SMTP_POOL_LOCK:
+                idle = _SMTP_POOL.get(key)
+                server, idle_since = idle.pop() if idle else (None, 0.0)
+            if server is None:
+                return self._open_smtp(smtp_config)
+            if time.monotonic() - idle_since > SMTP_IDLE_TTL:
+                self._close_smtp(server)
+                continue
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._close_smtp(server)
+
+    def _checkin_smtp(self, smtp_config: Dict[str, Any], server: smtplib.SMTP):
+        with _SMTP_POOL_LOCK:
+            _SMTP_POOL.setdefault(self._smtp_pool_key(smtp_config), []).append((server, time.monotonic()))
+
+    def _open_smtp(self, smtp_config: Dict[str, Any]) -> smtplib.SMTP:
+        # Connect with timeout and SSL context - use certifi for CA certs
+        server = smtplib.SMTP(smtp_config['smtp_server'], int(smtp_config['smtp_port']), timeout=30)
+        server.ehlo()
+        context = ssl.create_default_context()
+        if SSL_CERT_FILE:
+            context.load_verify_locations(SSL_CERT_FILE)
+        server.starttls(context=context)
+        server.ehlo()
+        server.login(smtp_config['email'], smtp_config['app_password'])
+        return server
+
+    @staticmethod
+    def _close_smtp(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            pass
+
     def get_active_email_list(self) -> list[str]:
         """Get list of active email addresses to send reports to"""
         conn = self.get_db_connection()
@@ -130,7 +247,15 @@ class EmailService:
         finally:
             conn.close()
 
-    def _normalize_markdown(self, text: str) -> str:
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _render_markdown(content: str) -> str:
+        """Markdown -> HTML, cached since the same report goes to every recipient."""
+        normalized = EmailService._normalize_markdown(content)
+        return markdown.markdown(normalized, extensions=['extra', 'tables', 'sane_lists', 'nl2br'])
+
+    @staticmethod
+    def _normalize_markdown(text: str) -> str:
         """
         Clean up common LLM Markdown quirks so tables render in HTML emails.
         - Strip leading whitespace on pipe-table rows.
@@ -200,14 +325,12 @@ class EmailService:
     def send_analysis_email(self, to_email: str, stock_symbol: str, stock_name: str, 
                            quarter: str, year: int, analysis_content: str, 
                            model_provider: str, model_name: str = None, 
-                           transcript_url: str = None) -> bool:
+                           transcript_url: str = None, session: Optional[SMTPSession] = None) -> bool:
         """Send analysis email using template"""
         try:
             # Convert Markdown (including tables/lists) to HTML; fall back to escaped text on failure
-            md_extensions = ['extra', 'tables', 'sane_lists', 'nl2br']
             try:
-                normalized = self._normalize_markdown(analysis_content or "")
-                analysis_html = markdown.markdown(normalized, extensions=md_extensions)
+                analysis_html = self._render_markdown(analysis_content or "")
             except Exception:
                 escaped = html.escape(analysis_content or "")
                 escaped_with_br = escaped.replace('\n', '<br>')
@@ -237,7 +360,8 @@ class EmailService:
                 to_email=to_email,
                 subject=subject,
                 body=html_body,
-                is_html=True
+                is_html=True,
+                session=session
             )
         except Exception as e:
             raise Exception(f"Failed to send analysis email: {str(e)}")
@@ -254,10 +378,8 @@ class EmailService:
     ) -> bool:
         """Send annual report research email."""
         try:
-            md_extensions = ['extra', 'tables', 'sane_lists', 'nl2br']
             try:
-                normalized = self._normalize_markdown(analysis_content or "")
-                analysis_html = markdown.markdown(normalized, extensions=md_extensions)
+                analysis_html = self._render_markdown(analysis_content or "")
             except Exception:
                 escaped = html.escape(analysis_content or "")
                 escaped_with_br = escaped.replace('\n', '<br>')
@@ -1,20 +1,26 @@
 import threading
 import sqlite3
 import os
-import sys
 import html
 from datetime import datetime
 from typing import List, Tuple, Dict
 import markdown
 import re
 
-# Add parent directory to path
-from config import DATABASE_PATH
+from config import DATABASE_PATH, run_after_migrations
 from db import get_db_connection
 from services.transcript_service import TranscriptService
 from services.llm.llm_service import LLMService
 from services.email_service import EmailService
 TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), '..', 'templates')
+# All article placeholders in one pattern, so the template is filled in a single pass
+_TEMPLATE_FIELD = re.compile(r"\{\{(GROUP_NAME|QUARTER|YEAR|MODEL_PROVIDER|MODEL_ID|STOCK_LIST|CONTENT|GENERATED_DATE)\}\}")
+
+# Deep research runs are long LLM calls over every transcript in a group. Cap how many
+# run at once across the process (the API and the scheduler each hold a service);
+# the rest wait in 'pending'.
+GROUP_RESEARCH_WORKERS = max(1, int(os.environ.get("GROUP_RESEARCH_WORKERS", "2")))
+_run_slots = threading.BoundedSemaphore(GROUP_RESEARCH_WORKERS)
 
 
 class GroupResearchService:
@@ -28,7 +34,7 @@ class GroupResearchService:
         self.transcript_service = TranscriptService()
         self.llm_service = LLMService()
         self.email_service = EmailService()
-        self.ensure_table()
+        run_after_migrations(self.ensure_table)
 
     def get_db_connection(self):
         return get_db_connection(self.db_path)
@@ -110,20 +116,20 @@ class GroupResearchService:
         except Exception:
             content_html = f"<pre>{html.escape(run.get('llm_output') or '')}</pre>"
 
-        stock_list = ", ".join([s.get("symbol") for s in stocks])
+        stock_list = ", ".join([s["symbol"] for s in stocks])
         replacements = {
-            "{{GROUP_NAME}}": html.escape(run.get("group_name", "")),
-            "{{QUARTER}}": html.escape(run.get("quarter", "")),
-            "{{YEAR}}": html.escape(str(run.get("year", ""))),
-            "{{MODEL_PROVIDER}}": html.escape(run.get("model_provider") or ""),
-            "{{MODEL_ID}}": html.escape(run.get("model_id") or ""),
-            "{{STOCK_LIST}}": html.escape(stock_list),
-            "{{CONTENT}}": content_html,
-            "{{GENERATED_DATE}}": html.escape(run.get("updated_at", "")),
+            "GROUP_NAME": html.escape(run.get("group_name", "")),
+            "QUARTER": html.escape(run.get("quarter", "")),
+            "YEAR": html.escape(str(run.get("year", ""))),
+            "MODEL_PROVIDER": html.escape(run.get("model_provider") or ""),
+            "MODEL_ID": html.escape(run.get("model_id") or ""),
+            "STOCK_LIST": html.escape(stock_list),
+            "CONTENT": content_html,
+            "GENERATED_DATE": html.escape(run.get("updated_at", "")),
         }
-        for key, val in replacements.items():
-            template = template.replace(key, val)
-        return template
+        # One scan of the template; substituted text (e.g. the article body) is
+        # never re-scanned for placeholders
+        return _TEMPLATE_FIELD.sub(lambda m: replacements[m.group(1)], template)
 
     def _group_stock_ids(self, cursor, group_id: int) -> List[int]:
         cursor.execute("SELECT stock_id FROM group_stocks WHERE group_id = ?", (group_id,))
@@ -145,7 +151,8 @@ class GroupResearchService:
             """,
             (group_id,),
         )
-        stocks = [dict(r) for r in cursor.fetchall()]
+        # Rows stay sqlite3.Row: everything downstream only reads them by key
+        stocks = cursor.fetchall()
 
         available = []
         missing = []
@@ -184,13 +191,24 @@ class GroupResearchService:
         )
         return [(row["quarter"], row["year"]) for row in cursor.fetchall()]
 
-    def _existing_run(self, cursor, group_id: int, quarter: str, year: int):
+    def _claim_run(self, cursor, group_id: int, quarter: str, year: int):
+        """
+        Create a pending run, or flip an errored one back to pending, in one statement.
+        Returns the run id, or None when a run already exists and isn't in error.
+        """
         cursor.execute(
-            "SELECT id, status FROM group_research_runs WHERE group_id = ? AND quarter = ? AND year = ?",
+            """
+            INSERT INTO group_research_runs (group_id, quarter, year, status)
+            VALUES (?, ?, ?, 'pending')
+            ON CONFLICT(group_id, quarter, year) DO UPDATE
+            SET status = 'pending', updated_at = CURRENT_TIMESTAMP, error_message = NULL
+            WHERE group_research_runs.status = 'error'
+            RETURNING id
+            """,
             (group_id, quarter, year),
         )
         row = cursor.fetchone()
-        return dict(row) if row else None
+        return row["id"] if row else None
 
     def check_and_trigger_runs(self):
         """
@@ -234,36 +252,14 @@ class GroupResearchService:
                     continue
 
                 for quarter, year in intersection:
-                    existing = self._existing_run(cursor, group_id, quarter, year)
-                    if existing:
-                        if existing["status"] in ("pending", "in_progress", "done"):
-                            continue
-                        if existing["status"] == "error":
-                            cursor.execute(
-                                """
-                                UPDATE group_research_runs
-                                SET status = 'pending', updated_at = CURRENT_TIMESTAMP, error_message = NULL
-                                WHERE id = ?
-                                """,
-                                (existing["id"],),
-                            )
-                            conn.commit()
-                            run_id = existing["id"]
-                        else:
-                            continue
-                    else:
-                        cursor.execute(
-                            """
-                            INSERT INTO group_research_runs (group_id, quarter, year, status)
-                            VALUES (?, ?, ?, 'pending')
-                            """,
-                            (group_id, quarter, year),
-                        )
-                        conn.commit()
-                        run_id = cursor.lastrowid
+                    # pending/in_progress/done runs are left alone; errored ones get retried
+                    run_id = self._claim_run(cursor, group_id, quarter, year)
+                    conn.commit()
+                    if run_id is None:
+                        continue
 
                     threading.Thread(
-                        target=self._process_run,
+                        target=self._run_with_slot,
                         args=(run_id, group_id, group["name"], quarter, year),
                         daemon=True,
                     ).start()
@@ -273,6 +269,10 @@ class GroupResearchService:
         finally:
             conn.close()
 
+    def _run_with_slot(self, *args):
+        with _run_slots:
+            self._process_run(*args)
+
     def _process_run(self, run_id: int, group_id: int, group_name: str, quarter: str, year: int, allow_partial: bool = False):
         conn = self.get_db_connection()
         cursor = conn.cursor()
@@ -516,17 +516,12 @@ class GroupResearchService:
                 VALUES (?, ?, ?, 'pending')
                 ON CONFLICT(group_id, quarter, year) DO UPDATE SET status='pending', updated_at=CURRENT_TIMESTAMP
                 WHERE 1=1
+                RETURNING id, (SELECT name FROM groups WHERE id = group_research_runs.group_id) AS group_name
                 """,
                 (group_id, quarter, year),
             )
-            conn.commit()
-
-            # Fetch run id
-            cursor.execute(
-                "SELECT id, (SELECT name FROM groups WHERE id = ?) as group_name FROM group_research_runs WHERE group_id = ? AND quarter = ? AND year = ?",
-                (group_id, group_id, quarter, year),
-            )
             row = cursor.fetchone()
+            conn.commit()
             if not row:
                 return None, [item["stock"]["symbol"] for item in available], [s["symbol"] for s in missing]
             run_id = row["id"]
@@ -534,7 +529,7 @@ class GroupResearchService:
 
             # Mark in_progress and start thread
             threading.Thread(
-                target=self._process_run,
+                target=self._run_with_slot,
                 args=(run_id, group_id, group_name, quarter, year, allow_partial),
                 daemon=True,
             ).start()
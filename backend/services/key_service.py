@@ -1,9 +1,7 @@
 import sqlite3
 import os
-import sys
 from typing import Optional
 
-# Add parent directory to path
 from config import DATABASE_PATH
 from db import get_db_connection
 
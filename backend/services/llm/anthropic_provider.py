@@ -4,7 +4,20 @@ Supports Claude 3 Opus, Sonnet, and Haiku models.
 """
 from anthropic import Anthropic
 from typing import List
-from .base_provider import BaseLLMProvider, LLMResponse, ModelInfo
+from .base_provider import BaseLLMProvider, LLMResponse, ModelInfo, PromptInput, prompt_parts
+
+THINKING_PREAMBLE = """Before providing your final analysis, think through the problem systematically:
+
+<thinking>
+1. Identify key financial metrics and data points
+2. Analyze trends, patterns, and anomalies
+3. Consider industry context and market conditions
+4. Formulate evidence-based conclusions
+</thinking>
+
+Then provide your comprehensive analysis.
+
+"""
 
 class AnthropicProvider(BaseLLMProvider):
     """Anthropic provider for Claude models."""
@@ -15,7 +28,7 @@ class AnthropicProvider(BaseLLMProvider):
     
     def generate(
         self, 
-        prompt: str, 
+        prompt: PromptInput, 
         system_prompt: str, 
         model_id: str,
         thinking_mode: bool = False,
@@ -23,22 +36,12 @@ class AnthropicProvider(BaseLLMProvider):
     ) -> LLMResponse:
         """Generate response using Claude model."""
         try:
-            # Add thinking mode instructions if enabled
+            # Add thinking mode instructions if enabled. Each piece goes out as its
+            # own text block, so the transcript is never copied into a combined string.
+            parts = prompt_parts(prompt)
             if thinking_mode:
-                enhanced_prompt = f"""Before providing your final analysis, think through the problem systematically:
-
-<thinking>
-1. Identify key financial metrics and data points
-2. Analyze trends, patterns, and anomalies
-3. Consider industry context and market conditions
-4. Formulate evidence-based conclusions
-</thinking>
-
-Then provide your comprehensive analysis.
-
-{prompt}"""
-            else:
-                enhanced_prompt = prompt
+                parts.insert(0, THINKING_PREAMBLE)
+            enhanced_prompt = [{"type": "text", "text": part} for part in parts if part]
             
             # Generate completion
             response = self.client.messages.create(
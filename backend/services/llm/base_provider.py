@@ -3,7 +3,15 @@ Base LLM Provider interface and response models.
 """
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import List, Optional, Sequence, Union
+
+# A prompt is either one string or a sequence of text pieces (e.g. a short header
+# plus a multi-MB transcript). Pieces let providers avoid building a combined copy.
+PromptInput = Union[str, Sequence[str]]
+
+def prompt_parts(prompt: PromptInput) -> List[str]:
+    """The prompt as a list of text pieces; a plain string is a single piece."""
+    return [prompt] if isinstance(prompt, str) else list(prompt)
 
 @dataclass
 class LLMResponse:
@@ -39,7 +47,7 @@ class BaseLLMProvider(ABC):
     @abstractmethod
     def generate(
         self, 
-        prompt: str, 
+        prompt: PromptInput, 
         system_prompt: str, 
         model_id: str,
         thinking_mode: bool = False,
@@ -50,7 +58,7 @@ class BaseLLMProvider(ABC):
         Generate a response from the LLM.
         
         Args:
-            prompt: The user prompt/question
+            prompt: The user prompt/question, as a string or a sequence of text pieces
             system_prompt: System instructions for the model
             model_id: Specific model to use
             thinking_mode: Whether to enable thinking/reasoning mode
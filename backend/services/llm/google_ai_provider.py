@@ -10,7 +10,7 @@ except ImportError:
     NEW_SDK = False
 
 from typing import List
-from .base_provider import BaseLLMProvider, LLMResponse, ModelInfo
+from .base_provider import BaseLLMProvider, LLMResponse, ModelInfo, PromptInput, prompt_parts
 
 class GoogleAIProvider(BaseLLMProvider):
     """Google AI Studio provider for Gemini models."""
@@ -24,7 +24,7 @@ class GoogleAIProvider(BaseLLMProvider):
     
     def generate(
         self, 
-        prompt: str, 
+        prompt: PromptInput, 
         system_prompt: str, 
         model_id: str,
         thinking_mode: bool = False,
@@ -33,6 +33,9 @@ class GoogleAIProvider(BaseLLMProvider):
     ) -> LLMResponse:
         """Generate response using Gemini model."""
         try:
+            # Both SDKs accept a list of text pieces as the contents
+            parts = prompt_parts(prompt)
+            prompt_chars = sum(len(part) for part in parts)
             if NEW_SDK:
                 # Determine if model supports thinking
                 # Gemini 2.5, 2.0 thinking variants, and 3.x models all support thinking
@@ -85,9 +88,7 @@ class GoogleAIProvider(BaseLLMProvider):
                 config = types.GenerateContentConfig(**config_args)
                 
                 # Add system instruction to contents
-                contents = prompt
-                if system_prompt:
-                    contents = f"{system_prompt}\n\n{prompt}"
+                contents = [system_prompt, *parts] if system_prompt else parts
                 
                 response = self.client.models.generate_content(
                     model=model_id,
@@ -96,7 +97,7 @@ class GoogleAIProvider(BaseLLMProvider):
                 )
                 
                 content = response.text
-                tokens_input = len(prompt) // 4  # Estimate if usage metadata missing
+                tokens_input = prompt_chars // 4  # Estimate if usage metadata missing
                 tokens_output = len(content) // 4
                 
                 if hasattr(response, 'usage_metadata'):
@@ -119,7 +120,7 @@ class GoogleAIProvider(BaseLLMProvider):
                 )
                 
                 response = model.generate_content(
-                    prompt,
+                    parts,
                     generation_config=generation_config
                 )
                 
@@ -129,7 +130,7 @@ class GoogleAIProvider(BaseLLMProvider):
                     tokens_input = response.usage_metadata.prompt_token_count
                     tokens_output = response.usage_metadata.candidates_token_count
                 except:
-                    tokens_input = len(prompt) // 4
+                    tokens_input = prompt_chars // 4
                     tokens_output = len(content) // 4
             
             # Calculate cost (placeholder, real cost in LLMService)
@@ -3,12 +3,11 @@ LLM Service - Main service for managing LLM providers and models.
 """
 import sqlite3
 from typing import List, Optional
-import sys
 import os
 
-from config import DATABASE_PATH
+from config import DATABASE_PATH_STR
 from db import get_db_connection
-from services.llm.base_provider import BaseLLMProvider, LLMResponse, ModelInfo
+from services.llm.base_provider import BaseLLMProvider, LLMResponse, ModelInfo, PromptInput
 from services.llm.google_ai_provider import GoogleAIProvider
 from services.llm.openai_provider import OpenAIProvider
 from services.llm.anthropic_provider import AnthropicProvider
@@ -21,7 +20,7 @@ class LLMService:
         self._provider_cache = {}
     
     def get_db_connection(self):
-        return get_db_connection(DATABASE_PATH)
+        return get_db_connection(DATABASE_PATH_STR)
     
     def _get_provider(self, provider_name: str) -> Optional[BaseLLMProvider]:
         """Get or create a provider instance."""
@@ -62,7 +61,7 @@ class LLMService:
     
     def generate(
         self,
-        prompt: str,
+        prompt: PromptInput,
         system_prompt: str,
         model_id: Optional[int] = None,
         thinking_mode: bool = False,
@@ -74,7 +73,7 @@ class LLMService:
         Generate a response using the specified or default model.
         
         Args:
-            prompt: User prompt
+            prompt: User prompt, or a sequence of text pieces sent without concatenating
             system_prompt: System instructions
             model_id: Database ID of model to use (None = use default)
             thinking_mode: Enable thinking mode
@@ -5,7 +5,17 @@ Supports GPT-5, GPT-4, GPT-3.5, and o1 thinking models.
 from openai import OpenAI
 from typing import List
 import tiktoken
-from .base_provider import BaseLLMProvider, LLMResponse, ModelInfo
+from .base_provider import BaseLLMProvider, LLMResponse, ModelInfo, PromptInput, prompt_parts
+
+THINKING_PREAMBLE = """Think through this step-by-step before providing your analysis:
+1. Identify key financial metrics and data points
+2. Analyze trends, patterns, and anomalies  
+3. Consider industry context and market conditions
+4. Formulate evidence-based conclusions
+
+Then provide your comprehensive analysis.
+
+"""
 
 class OpenAIProvider(BaseLLMProvider):
     """OpenAI provider for GPT models."""
@@ -16,7 +26,7 @@ class OpenAIProvider(BaseLLMProvider):
     
     def generate(
         self, 
-        prompt: str, 
+        prompt: PromptInput, 
         system_prompt: str, 
         model_id: str,
         thinking_mode: bool = False,
@@ -25,6 +35,8 @@ class OpenAIProvider(BaseLLMProvider):
     ) -> LLMResponse:
         """Generate response using OpenAI model."""
         try:
+            # Prefixes are joined with the pieces in one pass: a single copy of the prompt
+            parts = prompt_parts(prompt)
             # Check model type
             is_gpt5 = 'gpt-5' in model_id.lower()
             is_o1_model = model_id.startswith('o1')
@@ -34,7 +46,7 @@ class OpenAIProvider(BaseLLMProvider):
                 messages = []
                 if system_prompt:
                     messages.append({"role": "developer", "content": system_prompt})
-                messages.append({"role": "user", "content": prompt})
+                messages.append({"role": "user", "content": "".join(parts)})
                 
                 # Set reasoning effort
                 reasoning_config = None
@@ -51,7 +63,7 @@ class OpenAIProvider(BaseLLMProvider):
                 )
                 
                 content = response.output_text
-                tokens_input = len(prompt) // 4 # Estimate
+                tokens_input = sum(len(part) for part in parts) // 4 # Estimate
                 tokens_output = len(content) // 4
                 actual_thinking_mode = thinking_mode
                 
@@ -61,7 +73,7 @@ class OpenAIProvider(BaseLLMProvider):
                 if system_prompt:
                     # o1 supports developer role in newer versions
                     messages.append({"role": "developer", "content": system_prompt})
-                messages.append({"role": "user", "content": prompt})
+                messages.append({"role": "user", "content": "".join(parts)})
                 
                 response = self.client.chat.completions.create(
                     model=model_id,
@@ -82,17 +94,9 @@ class OpenAIProvider(BaseLLMProvider):
                 
                 # Add thinking mode instructions if enabled (manual prompting)
                 if thinking_mode:
-                    enhanced_prompt = f"""Think through this step-by-step before providing your analysis:
-1. Identify key financial metrics and data points
-2. Analyze trends, patterns, and anomalies  
-3. Consider industry context and market conditions
-4. Formulate evidence-based conclusions
-
-Then provide your comprehensive analysis.
-
-{prompt}"""
+                    enhanced_prompt = "".join([THINKING_PREAMBLE, *parts])
                 else:
-                    enhanced_prompt = prompt
+                    enhanced_prompt = "".join(parts)
                 
                 messages.append({"role": "user", "content": enhanced_prompt})
                 actual_thinking_mode = thinking_mode
@@ -5,7 +5,15 @@ Provides access to 400+ models from multiple providers.
 from openai import OpenAI
 from typing import List
 import requests
-from .base_provider import BaseLLMProvider, LLMResponse, ModelInfo
+from .base_provider import BaseLLMProvider, LLMResponse, ModelInfo, PromptInput, prompt_parts
+
+THINKING_PREAMBLE = """Think step-by-step before providing your analysis:
+1. Identify key metrics
+2. Analyze patterns
+3. Consider context
+4. Draw conclusions
+
+"""
 
 class OpenRouterProvider(BaseLLMProvider):
     """OpenRouter provider for accessing 400+ models."""
@@ -20,7 +28,7 @@ class OpenRouterProvider(BaseLLMProvider):
     
     def generate(
         self, 
-        prompt: str, 
+        prompt: PromptInput, 
         system_prompt: str, 
         model_id: str,
         thinking_mode: bool = False,
@@ -31,9 +39,11 @@ class OpenRouterProvider(BaseLLMProvider):
         try:
             # Check if it's an o1 model (no system prompt support)
             is_o1_model = 'o1' in model_id.lower()
+            # Prefixes are joined with the pieces in one pass: a single copy of the prompt
+            parts = prompt_parts(prompt)
             
             if is_o1_model:
-                combined_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
+                combined_prompt = "".join([system_prompt, "\n\n", *parts] if system_prompt else parts)
                 messages = [{"role": "user", "content": combined_prompt}]
                 actual_thinking_mode = True
             else:
@@ -42,15 +52,9 @@ class OpenRouterProvider(BaseLLMProvider):
                     messages.append({"role": "system", "content": system_prompt})
                 
                 if thinking_mode:
-                    enhanced_prompt = f"""Think step-by-step before providing your analysis:
-1. Identify key metrics
-2. Analyze patterns
-3. Consider context
-4. Draw conclusions
-
-{prompt}"""
+                    enhanced_prompt = "".join([THINKING_PREAMBLE, *parts])
                 else:
-                    enhanced_prompt = prompt
+                    enhanced_prompt = "".join(parts)
                 
                 messages.append({"role": "user", "content": enhanced_prompt})
                 actual_thinking_mode = thinking_mode
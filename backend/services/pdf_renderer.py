@@ -0,0 +1,26 @@
+"""HTML -> PDF rendering for analysis downloads.
+
+Kept free of Flask/DB imports so it can run inside a worker process.
+"""
+from io import BytesIO
+
+from xhtml2pdf import pisa
+
+# WeasyPrint lays out HTML/CSS far faster than xhtml2pdf but needs the native
+# pango/cairo libraries; fall back to pisa where they aren't installed
+try:
+    from weasyprint import HTML as WeasyHTML
+except (ImportError, OSError):
+    WeasyHTML = None
+
+
+def render_pdf(html_body: str) -> bytes:
+    """Render a complete HTML document to PDF bytes."""
+    if WeasyHTML is not None:
+        # With no target WeasyPrint returns the bytes itself; no buffer copy
+        return WeasyHTML(string=html_body).write_pdf()
+    pdf_buffer = BytesIO()
+    pdf_result = pisa.CreatePDF(html_body, dest=pdf_buffer)
+    if pdf_result.err:
+        raise RuntimeError('Failed to generate PDF')
+    return pdf_buffer.getvalue()
@@ -2,10 +2,6 @@ import sqlite3
 from typing import Optional
 import os
 
-# We need to access the DB. 
-# Ideally we'd inject the connection, but for now we'll create a new one or pass it in.
-# Importing DB_PATH from config would be better.
-import sys
 from config import DATABASE_PATH
 from db import get_db_connection
 
@@ -35,23 +31,35 @@ class PromptService:
         cursor = conn.cursor()
         
         try:
-            # Use one group's stock_summary_prompt for this stock (any group; use updated_at/added_at ordering)
+            # Use one group's stock_summary_prompt for this stock (any group; use updated_at/added_at ordering).
+            # The default prompt setting is the fallback in the same query, so a job costs one round-trip.
             query = """
-                SELECT g.stock_summary_prompt
-                FROM groups g
-                JOIN group_stocks gs ON g.id = gs.group_id
-                WHERE gs.stock_id = ? AND g.is_active = 1
-                ORDER BY gs.updated_at DESC, gs.added_at DESC
-                LIMIT 1
+                SELECT COALESCE(
+                    (
+                        SELECT NULLIF(g.stock_summary_prompt, '')
+                        FROM groups g
+                        JOIN group_stocks gs ON g.id = gs.group_id
+                        WHERE gs.stock_id = ? AND g.is_active = 1
+                        ORDER BY gs.updated_at DESC, gs.added_at DESC
+                        LIMIT 1
+                    ),
+                    (
+                        SELECT NULLIF(setting_value, '')
+                        FROM llm_settings
+                        WHERE setting_key = 'default_prompt'
+                        ORDER BY updated_at DESC
+                        LIMIT 1
+                    )
+                ) AS prompt
             """
             
             cursor.execute(query, (stock_id,))
             result = cursor.fetchone()
             
-            if result and result['stock_summary_prompt']:
-                return result['stock_summary_prompt']
+            if result and result['prompt']:
+                return result['prompt']
             
-            return self._get_default_prompt()
+            return DEFAULT_PROMPT_TEXT
             
         finally:
             conn.close()
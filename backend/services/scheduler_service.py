@@ -1,14 +1,12 @@
 import threading
-import time
 import sqlite3
 import os
-import sys
 from datetime import datetime, timedelta
 
-from config import DATABASE_PATH
+from config import DATABASE_PATH_STR, run_after_migrations, wait_for_migrations
 from db import get_db_connection
 from services.transcript_service import TranscriptService
-from services.analysis_worker import AnalysisWorker
+from services.analysis_worker import get_analysis_worker
 from services.group_research_service import GroupResearchService
 
 
@@ -46,7 +44,7 @@ class SchedulerService:
     def __init__(self, poll_interval_seconds=300):  # Default: 5 minutes
         self.poll_interval = poll_interval_seconds
         self.transcript_service = TranscriptService()
-        self.analysis_worker = AnalysisWorker()
+        self.analysis_worker = get_analysis_worker()
         self.group_research_service = GroupResearchService()
         self.running = False
         self.is_polling = False
@@ -55,11 +53,12 @@ class SchedulerService:
         self.next_poll_at = datetime.now()
         self.poll_lock = threading.Lock()
         self.status_lock = threading.Lock()
+        self.wakeup = threading.Event()  # set by stop() to end the loop's wait early
         self.thread = None
-        self.ensure_transcript_checks_table()
+        run_after_migrations(self.ensure_transcript_checks_table)
 
     def get_db_connection(self):
-        return get_db_connection(DATABASE_PATH)
+        return get_db_connection(DATABASE_PATH_STR)
 
     def ensure_transcript_checks_table(self):
         conn = self.get_db_connection()
@@ -98,19 +97,19 @@ class SchedulerService:
                 updated_at = CURRENT_TIMESTAMP
         """, rows)
 
-    def _is_in_watchlist(self, cursor, stock_id: int) -> bool:
-        cursor.execute("SELECT 1 FROM watchlist_items WHERE stock_id = ? LIMIT 1", (stock_id,))
-        return cursor.fetchone() is not None
-
-    def _is_in_active_group(self, cursor, stock_id: int) -> bool:
+    def _stock_membership(self, cursor, stock_id: int):
+        # Both auto-analysis eligibility flags in one round-trip
         cursor.execute("""
-            SELECT 1
-            FROM group_stocks gs
-            JOIN groups g ON g.id = gs.group_id
-            WHERE gs.stock_id = ? AND g.is_active = 1
-            LIMIT 1
-        """, (stock_id,))
-        return cursor.fetchone() is not None
+            SELECT
+                EXISTS(SELECT 1 FROM watchlist_items WHERE stock_id = ?) AS in_watchlist,
+                EXISTS(
+                    SELECT 1
+                    FROM group_stocks gs
+                    JOIN groups g ON g.id = gs.group_id
+                    WHERE gs.stock_id = ? AND g.is_active = 1
+                ) AS in_active_group
+        """, (stock_id, stock_id))
+        return cursor.fetchone()
 
     def _analysis_exists_for_quarter(self, cursor, stock_id: int, quarter: str, year: int) -> bool:
         cursor.execute("""
@@ -202,7 +201,15 @@ class SchedulerService:
             'next_poll_in_seconds': next_in,
         }
 
-    def _process_stock(self, cursor, conn, stock_row, track_status: bool = True, auto_analyze: bool = True):
+    def _start_analysis(self, stock_id: int, quarter: str, year: int):
+        # Queued right away; the worker dedupes via its transcript claim
+        try:
+            job_id = self.analysis_worker.start_analysis_job(stock_id, quarter, year)
+            print(f"[Scheduler] Analysis job started: {job_id}")
+        except Exception as e:
+            print(f"[Scheduler] Failed to start analysis: {e}")
+
+    def _process_stock(self, cursor, conn, stock_row, track_status: bool = True, auto_analyze: bool = True, status_marked: bool = False):
         """
         Handles transcript availability/upcoming checks for a single stock.
         Shared by the scheduler loop and one-off triggers.
@@ -212,9 +219,17 @@ class SchedulerService:
         """
         stock_id = stock_row['id']
         symbol = stock_row['stock_symbol'] or stock_row['bse_code']
+        membership = None
+
+        def stock_membership():
+            # Read once per check, and only if a latest-quarter transcript gets this far
+            nonlocal membership
+            if membership is None:
+                membership = self._stock_membership(cursor, stock_id)
+            return membership
 
         try:
-            if track_status:
+            if track_status and not status_marked:
                 try:
                     self._update_check_status(cursor, stock_id, 'checking')
                     conn.commit()
@@ -255,43 +270,40 @@ class SchedulerService:
                 
                 if not existing:
                     print(f"[Scheduler] New transcript found for {symbol}: {transcript.title}")
+                    # Single upsert: inserts the row, or if the quarter got stored in the
+                    # meantime (e.g. by an analysis job) marks it available with this URL
                     cursor.execute("""
                         INSERT INTO transcripts (stock_id, quarter, year, source_url, status)
                         VALUES (?, ?, ?, ?, 'available')
+                        ON CONFLICT(stock_id, quarter, year) DO UPDATE SET
+                            status = 'available',
+                            source_url = excluded.source_url,
+                            updated_at = CURRENT_TIMESTAMP
+                        WHERE transcripts.status != 'available'
+                           OR transcripts.source_url IS NULL
+                           OR transcripts.source_url != excluded.source_url
                     """, (stock_id, transcript.quarter, transcript.year, transcript.source_url))
                     conn.commit()
-
-                    # Ensure any existing upcoming rows for the same quarter/year are marked available
-                    cursor.execute("""
-                        UPDATE transcripts
-                        SET status = 'available', source_url = ?, updated_at = CURRENT_TIMESTAMP
-                        WHERE stock_id = ? AND quarter = ? AND year = ?
-                          AND (status != 'available' OR source_url IS NULL OR source_url != ?)
-                    """, (transcript.source_url, stock_id, transcript.quarter, transcript.year, transcript.source_url))
-                    if cursor.rowcount:
-                        conn.commit()
                     
                     # Only auto-trigger analysis for the LATEST quarter
                     if not auto_analyze:
                         print(f"[Scheduler] Skipping auto-analysis for {symbol} (not in watchlist)")
-                    elif not self._is_in_watchlist(cursor, stock_id):
-                        print(f"[Scheduler] Skipping auto-analysis for {symbol} (no longer in watchlist)")
-                    elif self._is_in_active_group(cursor, stock_id):
-                        print(f"[Scheduler] Skipping auto-analysis for {symbol} (stock is in an active group)")
                     elif transcript.quarter != latest_quarter or transcript.year != latest_year:
                         print(f"[Scheduler] Transcript {transcript.quarter} {transcript.year} stored but not auto-analyzed (not latest quarter)")
+                    elif not stock_membership()['in_watchlist']:
+                        print(f"[Scheduler] Skipping auto-analysis for {symbol} (no longer in watchlist)")
+                    elif stock_membership()['in_active_group']:
+                        print(f"[Scheduler] Skipping auto-analysis for {symbol} (stock is in an active group)")
                     elif self._analysis_in_progress_for_quarter(cursor, stock_id, transcript.quarter, transcript.year):
                         print(f"[Scheduler] Analysis already in progress for {symbol} {transcript.quarter} {transcript.year}, skipping")
                     elif self._analysis_exists_for_quarter(cursor, stock_id, transcript.quarter, transcript.year):
                         print(f"[Scheduler] Analysis already exists for {symbol} {transcript.quarter} {transcript.year}, skipping")
                     else:
                         print(f"[Scheduler] Auto-triggering analysis for {symbol} {transcript.quarter} {transcript.year}")
-                        try:
-                            job_id = self.analysis_worker.start_analysis_job(stock_id, transcript.quarter, transcript.year)
-                            print(f"[Scheduler] Analysis job started: {job_id}")
-                        except Exception as e:
-                            print(f"[Scheduler] Failed to start analysis: {e}")
+                        self._start_analysis(stock_id, transcript.quarter, transcript.year)
                 else:
+                    # UNIQUE(stock_id, quarter, year) makes `existing` the only row for its
+                    # quarter, so one conditional UPDATE covers it
                     if existing['status'] != 'available' or existing['source_url'] != transcript.source_url:
                         print(f"[Scheduler] Transcript now available for {symbol}: {transcript.title}")
                         cursor.execute("""
@@ -301,36 +313,23 @@ class SchedulerService:
                         """, (transcript.source_url, existing['id']))
                         conn.commit()
                     
-                    # Ensure any existing upcoming rows for the same quarter/year are marked available
-                    cursor.execute("""
-                        UPDATE transcripts
-                        SET status = 'available', source_url = ?, updated_at = CURRENT_TIMESTAMP
-                        WHERE stock_id = ? AND quarter = ? AND year = ?
-                          AND (status != 'available' OR source_url IS NULL OR source_url != ?)
-                    """, (transcript.source_url, stock_id, existing['quarter'], existing['year'], transcript.source_url))
-                    if cursor.rowcount:
-                        conn.commit()
-                    
                     # Only auto-trigger analysis for the LATEST quarter
                     if not auto_analyze:
                         print(f"[Scheduler] Skipping auto-analysis for {symbol} (not in watchlist)")
-                    elif not self._is_in_watchlist(cursor, stock_id):
-                        print(f"[Scheduler] Skipping auto-analysis for {symbol} (no longer in watchlist)")
-                    elif self._is_in_active_group(cursor, stock_id):
-                        print(f"[Scheduler] Skipping auto-analysis for {symbol} (stock is in an active group)")
                     elif existing['quarter'] != latest_quarter or existing['year'] != latest_year:
                         print(f"[Scheduler] Transcript {existing['quarter']} {existing['year']} updated but not auto-analyzed (not latest quarter)")
-                    elif self._analysis_in_progress_for_quarter(cursor, stock_id, existing['quarter'], existing['year']):
+                    elif not stock_membership()['in_watchlist']:
+                        print(f"[Scheduler] Skipping auto-analysis for {symbol} (no longer in watchlist)")
+                    elif stock_membership()['in_active_group']:
+                        print(f"[Scheduler] Skipping auto-analysis for {symbol} (stock is in an active group)")
+                    # `existing` is the quarter's only row, so its own status says if a job holds it
+                    elif existing['analysis_status'] == 'in_progress':
                         print(f"[Scheduler] Analysis already in progress for {symbol} {existing['quarter']} {existing['year']}, skipping")
                     elif self._analysis_exists_for_quarter(cursor, stock_id, existing['quarter'], existing['year']):
                         print(f"[Scheduler] Analysis already exists for {symbol} {existing['quarter']} {existing['year']}, skipping")
                     else:
                         print(f"[Scheduler] Auto-triggering analysis for {symbol} {existing['quarter']} {existing['year']}")
-                        try:
-                            job_id = self.analysis_worker.start_analysis_job(stock_id, existing['quarter'], existing['year'])
-                            print(f"[Scheduler] Analysis job started: {job_id}")
-                        except Exception as e:
-                            print(f"[Scheduler] Failed to start analysis: {e}")
+                        self._start_analysis(stock_id, existing['quarter'], existing['year'])
 
             # Fetch upcoming calls
             upcoming = self.transcript_service.get_upcoming_calls(symbol)
@@ -420,7 +419,7 @@ class SchedulerService:
                     conn,
                     stock,
                     track_status=False,
-                    auto_analyze=stock["id"] in watchlist_ids
+                    auto_analyze=stock["id"] in watchlist_ids,
                 )
                     
             print(f"[Scheduler] Poll completed at {datetime.now()}")
@@ -436,7 +435,7 @@ class SchedulerService:
                     print(f"[Scheduler] Failed to clear bulk check status: {e}")
             conn.close()
 
-    def check_and_schedule_stock(self, stock_id: int):
+    def check_and_schedule_stock(self, stock_id: int, status_marked: bool = False):
         """
         Runs the transcript check for a single stock immediately.
         Intended for use right after adding to watchlist/group.
@@ -451,20 +450,46 @@ class SchedulerService:
                 return
             cursor.execute("SELECT 1 FROM watchlist_items WHERE stock_id = ? LIMIT 1", (stock_id,))
             in_watchlist = cursor.fetchone() is not None
-            self._process_stock(cursor, conn, stock, auto_analyze=in_watchlist)
+            self._process_stock(cursor, conn, stock, auto_analyze=in_watchlist, status_marked=status_marked)
         except Exception as e:
             print(f"[Scheduler] Error checking stock {stock_id}: {e}")
         finally:
             conn.close()
 
-    def trigger_check_for_stock(self, stock_id: int):
+    def mark_check_pending(self, conn, stock_id: int):
+        """
+        Writes the 'checking' status on the caller's connection so it commits in the
+        same transaction as their insert. Follow with trigger_check_for_stock(..., status_marked=True).
+        """
+        self._update_check_status(conn.cursor(), stock_id, 'checking')
+
+    def mark_checks_pending(self, conn, stock_ids: list[int]):
+        """Bulk version of mark_check_pending."""
+        self._update_bulk_check_status(conn.cursor(), stock_ids, 'checking')
+
+    def trigger_check_for_stocks(self, stock_ids: list[int], status_marked: bool = False):
+        """
+        Background checks for a batch of stocks on a single thread, one after another.
+        """
+        def run():
+            for stock_id in stock_ids:
+                self.check_and_schedule_stock(stock_id, status_marked)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def trigger_check_for_stock(self, stock_id: int, status_marked: bool = False):
         """
         Fire-and-forget background check for a single stock to avoid blocking HTTP responses.
         """
-        threading.Thread(target=self.check_and_schedule_stock, args=(stock_id,), daemon=True).start()
+        threading.Thread(target=self.check_and_schedule_stock, args=(stock_id, status_marked), daemon=True).start()
 
     def _run_scheduler(self):
         """Background thread that runs the polling loop."""
+        # Never poll against a half-migrated schema
+        while not wait_for_migrations():
+            if not self.running:
+                return
+            print("[Scheduler] Still waiting for database migrations")
         while self.running:
             now = datetime.now()
             with self.status_lock:
@@ -474,8 +499,13 @@ class SchedulerService:
             if not is_polling and next_poll_at and now >= next_poll_at:
                 if self.poll_lock.acquire(blocking=False):
                     self._run_poll_cycle_locked()
+                    continue
 
-            time.sleep(1)
+            # Sleep until the next poll is due instead of waking every second to check.
+            # A poll that is running or just triggered has already pushed next_poll_at out.
+            wait_seconds = (next_poll_at - now).total_seconds() if next_poll_at else self.poll_interval
+            self.wakeup.wait(timeout=max(1.0, wait_seconds))
+            self.wakeup.clear()
 
     def start(self):
         """Starts the background scheduler."""
@@ -485,6 +515,7 @@ class SchedulerService:
         
         print(f"[Scheduler] Starting with {self.poll_interval}s interval")
         self.running = True
+        self.wakeup.clear()
         self._set_poll_status(next_poll_at=datetime.now())
         self.thread = threading.Thread(target=self._run_scheduler, daemon=True)
         self.thread.start()
@@ -493,5 +524,6 @@ class SchedulerService:
         """Stops the background scheduler."""
         print("[Scheduler] Stopping...")
         self.running = False
+        self.wakeup.set()
         if self.thread:
             self.thread.join(timeout=5)
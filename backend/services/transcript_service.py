@@ -1,17 +1,66 @@
+import functools
 import requests
 import os
-import sys
 from dataclasses import dataclass
 from typing import List, Optional
 from datetime import datetime
 from urllib.parse import urlsplit, urlunsplit, quote
 import sqlite3
 
-# Add parent directory to path
-from config import DATABASE_PATH
+from config import DATABASE_PATH_STR
 from db import get_db_connection
 from services.key_service import KeyService
 
+# Extracted text of recently downloaded transcripts, keyed by URL. A force re-run or a
+# group run over the same quarter reuses it instead of fetching and parsing the PDF
+# again. Failures raise, so they're never cached.
+TRANSCRIPT_TEXT_CACHE_SIZE = int(os.environ.get("TRANSCRIPT_TEXT_CACHE_SIZE", "16"))
+
+
+@functools.lru_cache(maxsize=TRANSCRIPT_TEXT_CACHE_SIZE)
+def _download_pdf_text(safe_url: str) -> str:
+    import tempfile
+    from pypdf import PdfReader
+
+    print(f"Downloading PDF from {safe_url}...")
+    # Some providers block default Python user agents; use a browsery UA
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
+        "Accept": "application/pdf,application/octet-stream;q=0.9,*/*;q=0.8",
+    }
+    session = requests.Session()
+    session.headers.update(headers)
+    response = session.get(safe_url, timeout=30)
+    if response.status_code == 403:
+        # Retry once with referrer to appease some CDNs
+        session.headers.update({"Referer": safe_url.rsplit('/', 1)[0]})
+        response = session.get(safe_url, timeout=30)
+    response.raise_for_status()
+
+    # Save to temporary file
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
+        tmp_file.write(response.content)
+        tmp_path = tmp_file.name
+
+    print(f"Extracting text from PDF...")
+    reader = PdfReader(tmp_path)
+
+    # Extract text from all pages
+    text_content = []
+    for page_num, page in enumerate(reader.pages):
+        text = page.extract_text()
+        if text:
+            text_content.append(text)
+
+    # Clean up temp file
+    os.unlink(tmp_path)
+
+    full_text = "\n\n".join(text_content)
+    print(f"Extracted {len(full_text)} characters from {len(reader.pages)} pages")
+
+    return full_text
+
+
 @dataclass
 class TranscriptMetadata:
     stock_symbol: str
@@ -28,7 +77,7 @@ class TranscriptService:
         self.base_url = "https://www.tijoristack.ai/api/v1"
 
     def get_db_connection(self):
-        return get_db_connection(DATABASE_PATH)
+        return get_db_connection(DATABASE_PATH_STR)
 
     def _get_headers(self) -> dict:
         api_key = self.key_service.get_api_key('tijori')
@@ -194,51 +243,11 @@ class TranscriptService:
         """
         Downloads the PDF from the URL and extracts text.
         """
-        import tempfile
-        from pypdf import PdfReader
-        
         try:
             safe_url = self._sanitize_url(url)
             if safe_url != url:
                 print(f"[TranscriptService] Sanitized URL for download: {safe_url}")
-            print(f"Downloading PDF from {safe_url}...")
-            # Some providers block default Python user agents; use a browsery UA
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
-                "Accept": "application/pdf,application/octet-stream;q=0.9,*/*;q=0.8",
-            }
-            session = requests.Session()
-            session.headers.update(headers)
-            response = session.get(safe_url, timeout=30)
-            if response.status_code == 403:
-                # Retry once with referrer to appease some CDNs
-                session.headers.update({"Referer": safe_url.rsplit('/', 1)[0]})
-                response = session.get(safe_url, timeout=30)
-            response.raise_for_status()
-            
-            # Save to temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-                tmp_file.write(response.content)
-                tmp_path = tmp_file.name
-            
-            print(f"Extracting text from PDF...")
-            reader = PdfReader(tmp_path)
-            
-            # Extract text from all pages
-            text_content = []
-            for page_num, page in enumerate(reader.pages):
-                text = page.extract_text()
-                if text:
-                    text_content.append(text)
-            
-            # Clean up temp file
-            import os
-            os.unlink(tmp_path)
-            
-            full_text = "\n\n".join(text_content)
-            print(f"Extracted {len(full_text)} characters from {len(reader.pages)} pages")
-            
-            return full_text
+            return _download_pdf_text(safe_url)
             
         except Exception as e:
             print(f"Error downloading/extracting PDF: {e}")
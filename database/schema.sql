@@ -38,6 +38,9 @@ CREATE TABLE IF NOT EXISTS groups (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Group names are unique case-insensitively
+CREATE UNIQUE INDEX IF NOT EXISTS idx_groups_name_nocase ON groups(LOWER(name));
+
 -- Group Stocks Link Table (Many-to-Many)
 CREATE TABLE IF NOT EXISTS group_stocks (
     group_id INTEGER NOT NULL,
@@ -48,6 +51,8 @@ CREATE TABLE IF NOT EXISTS group_stocks (
     FOREIGN KEY (group_id) REFERENCES groups(id) ON DELETE CASCADE,
     FOREIGN KEY (stock_id) REFERENCES stocks(id) ON DELETE CASCADE
 );
+-- Covers "is this stock in an active group" lookups without touching the table
+CREATE INDEX IF NOT EXISTS idx_group_stocks_stock_group ON group_stocks(stock_id, group_id);
 
 -- Email List Table
 CREATE TABLE IF NOT EXISTS email_list (
@@ -146,7 +151,7 @@ CREATE TABLE IF NOT EXISTS transcript_analyses (
 
 -- Index for transcript lookups
 CREATE INDEX IF NOT EXISTS idx_transcripts_stock ON transcripts(stock_id);
-CREATE INDEX IF NOT EXISTS idx_analyses_transcript ON transcript_analyses(transcript_id);
+CREATE INDEX IF NOT EXISTS idx_analyses_transcript_created ON transcript_analyses(transcript_id, created_at DESC);
 
 -- Group Deep Research Runs (per group, per quarter)
 CREATE TABLE IF NOT EXISTS group_research_runs (
@@ -224,3 +229,9 @@ CREATE INDEX IF NOT EXISTS idx_llm_models_active ON llm_models(is_active);
 -- RE-DEFINING group_stocks to include updated_at
 -- In a real migration we would alter, but here we update the schema definition for new installs.
 -- Existing users might need a migration step.
+
+-- Key/value bookkeeping for startup migrations (e.g. data_version)
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
@@ -32,12 +32,18 @@ def create_database():
         with open(SCHEMA_PATH, 'r') as f:
             schema_sql = f.read()
         
-        # Create database and execute schema
+        # Create database and execute schema as one transaction: executescript
+        # otherwise commits (and syncs) after every CREATE statement
         conn = sqlite3.connect(DATABASE_PATH)
         cursor = conn.cursor()
-        cursor.executescript(schema_sql)
-        conn.commit()
-        conn.close()
+        try:
+            cursor.executescript(f"BEGIN;\n{schema_sql}\nCOMMIT;")
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            conn.close()
         
         logger.info(f"Database created successfully at {DATABASE_PATH}")
         return True